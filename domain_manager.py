@@ -5,8 +5,18 @@ Lorekeeper TRPG Bot - Domain Manager Module
 
 import os
 import json
+import stat
 import logging
-from typing import Optional, Dict, Any, List
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+
+# 빠른 JSON 직렬화 (없으면 표준 json 사용)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # =========================================================
 # 상수 정의
@@ -132,6 +142,9 @@ def load_json(filepath: str, default_val: Any) -> Any:
         return default_val
     
     try:
+        if orjson is not None:
+            with open(filepath, 'rb') as f:
+                return orjson.loads(f.read())
         with open(filepath, 'r', encoding='utf-8') as f:
             return json.load(f)
     except json.JSONDecodeError as e:
@@ -142,15 +155,62 @@ def load_json(filepath: str, default_val: Any) -> Any:
         return default_val
 
 
-def save_json(filepath: str, data: Any) -> bool:
-    """JSON 파일을 저장합니다."""
+# 파일별 쓰기 잠금 (이벤트 루프와 작업 스레드가 같은 파일을 동시에 저장하지 않도록)
+_file_locks: Dict[str, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+
+def _get_file_lock(filepath: str) -> threading.Lock:
+    """파일 경로별 쓰기 잠금을 반환합니다."""
+    with _file_locks_guard:
+        lock = _file_locks.get(filepath)
+        if lock is None:
+            lock = _file_locks[filepath] = threading.Lock()
+        return lock
+
+
+# 새 파일의 기본 권한 계산용 umask (os.umask는 읽기만 할 수 없어 임포트 시 한 번 조회)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _get_file_mode(filepath: str) -> int:
+    """기존 파일의 권한을 반환합니다. (없으면 umask 기준 기본 권한)"""
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        logging.error(f"JSON 저장 실패 {filepath}: {e}")
-        return False
+        return stat.S_IMODE(os.stat(filepath).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def save_json(filepath: str, data: Any) -> bool:
+    """
+    JSON 파일을 저장합니다. (임시 파일 기록 후 교체하여 원자적으로 저장)
+    
+    임시 파일은 저장마다 같은 디렉터리에 고유한 이름으로 만들고, 같은 파일의 저장은
+    잠금으로 순서대로 처리합니다. 실패하면 임시 파일을 지우고 False를 반환합니다.
+    """
+    with _get_file_lock(filepath):
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath) or ".", suffix=".tmp")
+            if orjson is not None:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+            # mkstemp는 0600으로 만들므로 대상 파일의 권한을 이어받음
+            os.chmod(tmp_path, _get_file_mode(filepath))
+            os.replace(tmp_path, filepath)
+            return True
+        except Exception as e:
+            logging.error(f"JSON 저장 실패 {filepath}: {e}")
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return False
 
 
 def load_text(filepath: str, default_val: str) -> str:
@@ -166,8 +226,40 @@ def load_text(filepath: str, default_val: str) -> str:
         return default_val
 
 
+# 로어/룰 텍스트 캐시: {경로: (mtime_ns, 크기, 내용)}
+_text_cache: Dict[str, Tuple[int, int, str]] = {}
+
+
+def load_text_cached(filepath: str, default_val: str) -> str:
+    """
+    텍스트 파일을 로드하되, 파일이 바뀌지 않았으면 메모리 캐시를 반환합니다.
+    
+    수정 시각(ns)과 크기로 변경 여부를 판단하므로 stat 1회로 끝납니다.
+    """
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        _text_cache.pop(filepath, None)
+        return default_val
+    
+    cached = _text_cache.get(filepath)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except Exception as e:
+        logging.error(f"텍스트 로드 실패 {filepath}: {e}")
+        return default_val
+    
+    _text_cache[filepath] = (st.st_mtime_ns, st.st_size, text)
+    return text
+
+
 def save_text(filepath: str, text: str) -> bool:
     """텍스트 파일을 저장합니다."""
+    _text_cache.pop(filepath, None)
     try:
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(text)
@@ -250,6 +342,19 @@ def save_domain(channel_id: str, data: Dict[str, Any]) -> bool:
     return save_json(get_session_file_path(channel_id), data)
 
 
+@contextmanager
+def domain_transaction(channel_id: str) -> Iterator[Dict[str, Any]]:
+    """
+    도메인 데이터를 한 번 읽고, 블록이 정상 종료되면 한 번만 저장합니다.
+    
+    여러 setter를 연달아 호출할 때의 반복 읽기/쓰기를 묶는 용도입니다.
+    블록 내에서 예외가 발생하면 저장하지 않습니다.
+    """
+    d = get_domain(channel_id)
+    yield d
+    save_domain(channel_id, d)
+
+
 # =========================================================
 # 참가자 관리
 # =========================================================
@@ -296,6 +401,16 @@ def _create_default_participant(display_name: str) -> Dict[str, Any]:
     }
 
 
+def is_participant_current(p_data: Optional[Dict[str, Any]]) -> bool:
+    """활성 상태이고 마이그레이션할 필드도 없는 참가자인지 확인합니다."""
+    return (
+        p_data is not None
+        and p_data.get("status") == "active"
+        and "ai_memory" in p_data
+        and "economy" in p_data
+    )
+
+
 def update_participant(channel_id: str, user, reset: bool = False) -> bool:
     """
     참가자를 등록하거나 업데이트합니다.
@@ -307,6 +422,8 @@ def update_participant(channel_id: str, user, reset: bool = False) -> bool:
     
     Returns:
         성공 여부
+    
+    이미 활성 상태이고 마이그레이션할 필드도 없는 참가자라면 디스크에 쓰지 않습니다.
     """
     d = get_domain(channel_id)
     uid = str(user.id)
@@ -314,6 +431,9 @@ def update_participant(channel_id: str, user, reset: bool = False) -> bool:
     if reset or uid not in d["participants"]:
         d["participants"][uid] = _create_default_participant(user.display_name)
     else:
+        if is_participant_current(d["participants"][uid]):
+            return True
+        
         # 기존 참가자는 상태만 활성화
         d["participants"][uid]["status"] = "active"
         
@@ -350,6 +470,20 @@ def get_participant_data(channel_id: str, user_id: str) -> Optional[Dict[str, An
     return d["participants"].get(str(user_id))
 
 
+@contextmanager
+def participant_transaction(channel_id: str, user_id: str) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    참가자 데이터를 직접 수정할 수 있도록 제공하고, 블록 종료 시 한 번만 저장합니다.
+    
+    참가자가 없으면 None을 제공하며 저장하지 않습니다.
+    """
+    d = get_domain(channel_id)
+    p_data = d["participants"].get(str(user_id))
+    yield p_data
+    if p_data is not None:
+        save_domain(channel_id, d)
+
+
 def save_participant_data(channel_id: str, user_id: str, data: Dict[str, Any]) -> None:
     """참가자 데이터를 저장합니다."""
     d = get_domain(channel_id)
@@ -393,7 +527,7 @@ def set_participant_status(channel_id: str, uid: str, status: str, reason: str =
 # =========================================================
 def get_lore(channel_id: str) -> str:
     """로어를 가져옵니다."""
-    return load_text(get_lore_file_path(channel_id), DEFAULT_LORE)
+    return load_text_cached(get_lore_file_path(channel_id), DEFAULT_LORE)
 
 
 def append_lore(channel_id: str, text: str) -> None:
@@ -416,11 +550,18 @@ def reset_lore(channel_id: str) -> None:
 
 def get_lore_summary(channel_id: str) -> Optional[str]:
     """요약된 로어를 가져옵니다."""
-    path = get_lore_summary_file_path(channel_id)
-    if os.path.exists(path):
-        content = load_text(path, "")
-        return content if content else None
-    return None
+    content = load_text_cached(get_lore_summary_file_path(channel_id), "")
+    return content if content else None
+
+
+def get_lore_and_rules(channel_id: str) -> Tuple[str, str]:
+    """
+    AI 컨텍스트용 로어(요약본 우선)와 룰을 함께 가져옵니다.
+    
+    파일 읽기를 한 번에 묶어 비동기 쪽에서 스레드 한 번으로 호출할 수 있게 합니다.
+    """
+    lore = get_lore_summary(channel_id) or get_lore(channel_id)
+    return lore, get_rules(channel_id)
 
 
 def save_lore_summary(channel_id: str, summary_text: str) -> None:
@@ -437,7 +578,7 @@ def save_lore_summary(channel_id: str, summary_text: str) -> None:
 
 def get_rules(channel_id: str) -> str:
     """룰을 가져옵니다."""
-    return load_text(get_rules_file_path(channel_id), DEFAULT_RULES)
+    return load_text_cached(get_rules_file_path(channel_id), DEFAULT_RULES)
 
 
 def get_rules_mode(channel_id: str) -> str:
@@ -669,8 +810,20 @@ def set_location_rules(channel_id: str, rules: Dict[str, Any]) -> None:
 # =========================================================
 def append_history(channel_id: str, role: str, content: str) -> None:
     """대화 히스토리에 항목을 추가합니다."""
+    append_history_batch(channel_id, [(role, content)])
+
+
+def append_history_batch(channel_id: str, items: List[Tuple[str, str]]) -> None:
+    """
+    여러 (role, content) 항목을 한 번의 읽기/쓰기로 히스토리에 추가합니다.
+    
+    유저 입력과 AI 응답처럼 연달아 기록되는 항목을 묶어 저장할 때 사용합니다.
+    """
+    if not items:
+        return
+    
     d = get_domain(channel_id)
-    d["history"].append({"role": role, "content": content})
+    d["history"].extend({"role": role, "content": content} for role, content in items)
     
     # 최대 길이 초과 시 오래된 항목 제거
     if len(d["history"]) > MAX_HISTORY_LENGTH:
@@ -818,19 +971,17 @@ def get_party_status_context(channel_id: str) -> str:
         )
         active_players.append(player_info)
     
-    # 결과 조합
-    result = f"### ACTIVE PLAYERS ({len(active_players)}명)\n"
-    result += "**Important:** Each [Name] is a separate player. Track actions individually.\n\n"
-    
-    if active_players:
-        result += "\n\n".join(active_players)
-    else:
-        result += "(없음)"
+    # 결과 조합 (조각을 모아 한 번에 결합)
+    parts = [
+        f"### ACTIVE PLAYERS ({len(active_players)}명)\n",
+        "**Important:** Each [Name] is a separate player. Track actions individually.\n\n",
+        "\n\n".join(active_players) if active_players else "(없음)",
+    ]
     
     if inactive_players:
-        result += f"\n\n### INACTIVE: {', '.join(inactive_players)}"
+        parts.append(f"\n\n### INACTIVE: {', '.join(inactive_players)}")
     
-    return result
+    return "".join(parts)
 
 
 # =========================================================
@@ -41,7 +41,10 @@ except ImportError:
 # =========================================================
 
 # 발효 트리거 임계값
-FRESH_THRESHOLD = 40          # FRESH 최대 개수 (초과 시 발효)
+# FRESH 최대 개수 (초과 시 발효)
+# domain_manager.MAX_HISTORY_LENGTH(40)보다 작아야 함 - 같거나 크면 히스토리가
+# 먼저 잘려 나가 발효가 일어나지 않고, 세션에 재생되는 히스토리도 줄지 않음
+FRESH_THRESHOLD = 30
 FERMENT_CHUNK_SIZE = 20       # 한 번에 발효할 메시지 수
 FERMENTED_THRESHOLD = 5       # FERMENTED 최대 개수 (초과 시 DEEP 압축)
 
@@ -481,69 +484,101 @@ Preserve narrative significance; let trivial details fade.
 # 자동 발효 프로세스
 # =========================================================
 
+def _count_remaining_prefix(
+    chunk: List[Dict[str, str]],
+    history: List[Dict[str, str]]
+) -> int:
+    """
+    요약한 chunk 중 아직 history 앞쪽에 남아 있는 항목 수를 반환합니다.
+    
+    요약을 기다리는 동안 히스토리가 최대 길이를 넘어 앞쪽이 잘렸을 수 있으므로
+    chunk의 뒷부분과 history의 앞부분이 겹치는 길이를 찾습니다.
+    """
+    for count in range(min(len(chunk), len(history)), 0, -1):
+        if history[:count] == chunk[-count:]:
+            return count
+    return 0
+
+
 async def auto_ferment(
     client,
     model_id: str,
     session_data: Dict[str, Any],
-    save_callback=None
+    transaction=None
 ) -> Dict[str, Any]:
-    """세션 데이터를 검사하고 필요 시 자동으로 발효합니다."""
-    changes_made = False
+    """
+    세션 데이터를 검사하고 필요 시 자동으로 발효합니다.
     
-    if "fermented_history" not in session_data:
-        session_data["fermented_history"] = []
+    요약은 session_data 스냅샷으로 만들고, 결과(히스토리 정리, fermented_history,
+    deep_memory)는 transaction()이 돌려주는 최신 세션 데이터에만 반영합니다.
+    요약을 기다리는 동안 저장된 다른 변경을 스냅샷으로 덮어쓰지 않기 위함입니다.
+    transaction이 없으면 session_data에 직접 반영합니다.
+    """
+    ensure_memory_fields(session_data)
     
-    if "deep_memory" not in session_data:
-        session_data["deep_memory"] = ""
+    summarized_chunk: List[Dict[str, str]] = []
+    fermented_entry: Optional[Dict[str, Any]] = None
     
     # FRESH → FERMENTED 발효 체크
     if should_ferment_fresh(session_data):
         logger.info("[Fermentation] FRESH 발효 시작...")
         
-        history = session_data["history"]
+        summarized_chunk = session_data["history"][:FERMENT_CHUNK_SIZE]
         
         summary = await compress_fresh_to_fermented(
             client, model_id, 
-            history[:FERMENT_CHUNK_SIZE]
+            summarized_chunk
         )
         
         if summary:
-            session_data["fermented_history"].append({
+            fermented_entry = {
                 "timestamp": get_timestamp(),
                 "summary": summary,
                 "message_count": FERMENT_CHUNK_SIZE
-            })
-            
-            session_data["history"] = history[FERMENT_CHUNK_SIZE:]
-            changes_made = True
-            
-            logger.info(f"[Fermentation] FRESH 발효 완료: "
-                       f"history {len(history)} → {len(session_data['history'])}")
+            }
     
-    # FERMENTED → DEEP 압축 체크
-    if should_compress_to_deep(session_data):
+    # FERMENTED → DEEP 압축 체크 (방금 발효한 항목 포함)
+    fermented = list(session_data["fermented_history"])
+    if fermented_entry is not None:
+        fermented.append(fermented_entry)
+    
+    deep_summary = None
+    if len(fermented) > FERMENTED_THRESHOLD:
         logger.info("[Fermentation] DEEP 압축 시작...")
         
-        fermented = session_data["fermented_history"]
-        current_deep = session_data.get("deep_memory", "")
-        
         deep_summary = await compress_fermented_to_deep(
             client, model_id,
-            fermented, current_deep
+            fermented, session_data.get("deep_memory", "")
         )
+    
+    if fermented_entry is None and not deep_summary:
+        return session_data
+    
+    def apply_changes(data: Dict[str, Any]) -> None:
+        ensure_memory_fields(data)
+        
+        if fermented_entry is not None:
+            history = data.get("history", [])
+            data["history"] = history[_count_remaining_prefix(summarized_chunk, history):]
+            data["fermented_history"].append(fermented_entry)
+            
+            logger.info(f"[Fermentation] FRESH 발효 완료: "
+                       f"history {len(history)} → {len(data['history'])}")
         
         if deep_summary:
-            session_data["deep_memory"] = deep_summary
-            session_data["fermented_history"] = []
-            changes_made = True
+            data["deep_memory"] = deep_summary
+            data["fermented_history"] = data["fermented_history"][len(fermented):]
             
             logger.info(f"[Fermentation] DEEP 압축 완료: "
                        f"fermented {len(fermented)}개 → deep {len(deep_summary)}자")
     
-    if changes_made and save_callback:
-        save_callback()
+    if transaction is None:
+        apply_changes(session_data)
+        return session_data
     
-    return session_data
+    with transaction() as latest:
+        apply_changes(latest)
+    return latest
 
 
 # =========================================================
@@ -953,7 +988,7 @@ async def create_context_cache(
         from datetime import timedelta
         ttl = timedelta(minutes=ttl_minutes)
         
-        cache = client.caches.create(
+        cache = await client.aio.caches.create(
             model=model_id,
             config=types.CreateCachedContentConfig(
                 display_name=f"lorekeeper-{channel_id}",
@@ -1032,7 +1067,7 @@ async def delete_context_cache(client, channel_id: str) -> bool:
         return False
     
     try:
-        client.caches.delete(name=cache_name)
+        await client.aio.caches.delete(name=cache_name)
         invalidate_cache(channel_id)
         logger.info(f"[Caching] 캐시 삭제 완료 - {channel_id}")
         return True
@@ -5,6 +5,7 @@ Lorekeeper TRPG Bot - Input Handler Module
 
 import re
 import random
+import unicodedata
 from typing import Optional, Dict, Any, Tuple, List
 
 # =========================================================
@@ -13,17 +14,109 @@ from typing import Optional, Dict, Any, Tuple, List
 MAX_DICE_COUNT = 100  # 최대 주사위 개수
 MAX_DICE_SIDES = 1000  # 최대 주사위 면 수
 
+# 정규식은 모듈 로드 시 한 번만 컴파일
+# 마크다운 기호는 기존과 같이 순서대로 하나씩 제거 (앞 패턴 제거 후 드러나는 기호도 처리)
+MARKDOWN_PATTERNS = tuple(
+    re.compile(p) for p in (r'\*\*\*', r'\*\*', r'___', r'__', r'~~', r'\|\|', r'`')
+)
+DICE_PATTERN = re.compile(r"(\d+)d(\d+)([+-]\d+)?")
+OOC_INLINE_PATTERN = re.compile(r'\(OOC[:\s]+(.+?)\)', re.IGNORECASE | re.DOTALL)
+
+# 시스템 명령어 매핑 사전 (한국어 별칭 포함) - 메시지마다 다시 만들지 않도록 모듈 로드 시 1회 생성
+COMMAND_ALIASES = {
+    # === 세션 및 준비 ===
+    '준비': 'ready',
+    'ready': 'ready',
+    '리셋': 'reset',
+    '초기화': 'reset',
+    'reset': 'reset',
+    '시작': 'start',
+    'start': 'start',
+    '잠금해제': 'unlock',
+    'unlock': 'unlock',
+    '잠금': 'lock',
+    'lock': 'lock',
+    
+    # === 진행 및 모드 ===
+    '진행': 'next',
+    '건너뛰기': 'next',
+    'next': 'next',
+    '턴': 'turn',
+    'turn': 'turn',
+    '모드': 'mode',
+    'mode': 'mode',
+    
+    # === 참가자 관리 ===
+    '가면': 'mask',
+    'mask': 'mask',
+    '설명': 'desc',
+    'desc': 'desc',
+    '정보': 'info',
+    '내정보': 'info',
+    'info': 'info',
+    '잠수': 'afk',
+    'afk': 'afk',
+    '이탈': 'leave',
+    '퇴장': 'leave',
+    'leave': 'leave',
+    '복귀': 'back',
+    '컴백': 'back',
+    'back': 'back',
+    
+    # === 세계관 설정 ===
+    '로어': 'lore',
+    'lore': 'lore',
+    '룰': 'rule',
+    'rule': 'rule',
+    
+    # === 퀘스트/메모 (직접 추가용) ===
+    '퀘스트': 'quest',
+    'quest': 'quest',
+    '메모': 'memo',
+    'memo': 'memo',
+    '연대기': 'lores',
+    'lores': 'lores',
+    
+    # === NPC 정보 ===
+    'npc': 'npc',
+    'npc정보': 'npc',
+    '엔피씨': 'npc',
+    
+    # === AI 분석 도구 ===
+    '분석': 'analyze',
+    'analyze': 'analyze',
+    '일관성': 'consistency',
+    'consistency': 'consistency',
+    '세계규칙': 'worldrules',
+    'worldrules': 'worldrules',
+    '예측': 'forecast',
+    'forecast': 'forecast',
+    '둠': 'doom',
+    'doom': 'doom',
+    
+    # === 주사위 ===
+    '주사위': 'roll',
+    '굴림': 'roll',
+    'r': 'roll',
+    'roll': 'roll',
+    
+    # === 도움말 ===
+    '도움': 'help',
+    '도움말': 'help',
+    'help': 'help',
+    '명령어': 'help',
+}
+
 
 def strip_discord_markdown(text: str) -> str:
     """메시지 앞뒤 및 내부의 디스코드 마크다운 기호를 제거합니다."""
     if not text:
         return ""
     
-    patterns = [r'\*\*\*', r'\*\*', r'___', r'__', r'~~', r'\|\|', r'`']
     clean_text = text
     
-    for p in patterns:
-        clean_text = re.sub(p, '', clean_text)
+    for p in MARKDOWN_PATTERNS:
+        clean_text = p.sub('', clean_text)
     
     return clean_text.strip()
 
@@ -54,7 +147,7 @@ def roll_dice(dice_str: str, mode: str = "normal") -> Optional[Tuple[int, Any, i
         Tuple[최종값, 굴림결과, 수정치, 상세설명] 또는 None (파싱 실패 시)
     """
     # 정규식: 숫자d숫자(+/-숫자)
-    match = re.search(r"(\d+)d(\d+)([+-]\d+)?", dice_str.lower())
+    match = DICE_PATTERN.search(dice_str.lower())
     if not match:
         return None
     
@@ -108,7 +201,9 @@ def parse_input(content: str) -> Optional[Dict[str, Any]]:
         - content: 인자 또는 내용
         - style: (chat 타입일 때) 'Dialogue', 'Action', 'Description'
     """
-    raw_content = content.strip()
+    # 한글이 자모 분리(NFD)로 들어와도 이후 길이·비교가 음절 단위로 맞도록 NFC로 통일
+    # (이미 NFC면 빠른 검사 후 같은 객체를 그대로 반환)
+    raw_content = unicodedata.normalize("NFC", content).strip()
     clean_content = strip_discord_markdown(raw_content)
     
     if not clean_content:
@@ -120,94 +215,8 @@ def parse_input(content: str) -> Optional[Dict[str, Any]]:
         command = parts[0].lower()
         args = parts[1] if len(parts) > 1 else ""
         
-        # 시스템 명령어 매핑 사전 (한국어 별칭 포함)
-        mapping = {
-            # === 세션 및 준비 ===
-            '준비': 'ready',
-            'ready': 'ready',
-            '리셋': 'reset',
-            '초기화': 'reset',
-            'reset': 'reset',
-            '시작': 'start',
-            'start': 'start',
-            '잠금해제': 'unlock',
-            'unlock': 'unlock',
-            '잠금': 'lock',
-            'lock': 'lock',
-            
-            # === 진행 및 모드 ===
-            '진행': 'next',
-            '건너뛰기': 'next',
-            'next': 'next',
-            '턴': 'turn',
-            'turn': 'turn',
-            '모드': 'mode',
-            'mode': 'mode',
-            
-            # === 참가자 관리 ===
-            '가면': 'mask',
-            'mask': 'mask',
-            '설명': 'desc',
-            'desc': 'desc',
-            '정보': 'info',
-            '내정보': 'info',
-            'info': 'info',
-            '잠수': 'afk',
-            'afk': 'afk',
-            '이탈': 'leave',
-            '퇴장': 'leave',
-            'leave': 'leave',
-            '복귀': 'back',
-            '컴백': 'back',
-            'back': 'back',
-            
-            # === 세계관 설정 ===
-            '로어': 'lore',
-            'lore': 'lore',
-            '룰': 'rule',
-            'rule': 'rule',
-            
-            # === 퀘스트/메모 (직접 추가용) ===
-            '퀘스트': 'quest',
-            'quest': 'quest',
-            '메모': 'memo',
-            'memo': 'memo',
-            '연대기': 'lores',
-            'lores': 'lores',
-            
-            # === NPC 정보 ===
-            'npc': 'npc',
-            'npc정보': 'npc',
-            '엔피씨': 'npc',
-            
-            # === AI 분석 도구 ===
-            '분석': 'analyze',
-            'analyze': 'analyze',
-            '일관성': 'consistency',
-            'consistency': 'consistency',
-            '세계규칙': 'worldrules',
-            'worldrules': 'worldrules',
-            '예측': 'forecast',
-            'forecast': 'forecast',
-            '둠': 'doom',
-            'doom': 'doom',
-            
-            # === 주사위 ===
-            '주사위': 'roll',
-            '굴림': 'roll',
-            'r': 'roll',
-            'roll': 'roll',
-            
-            # === 도움말 ===
-            '도움': 'help',
-            '도움말': 'help',
-            'help': 'help',
-            '명령어': 'help',
-        }
-        
-        # 매핑 확인
-        if command in mapping:
-            command = mapping[command]
+        # 매핑 확인 (별칭이 아니면 그대로)
+        command = COMMAND_ALIASES.get(command, command)
         
         # 주사위 특수 처리 (!r, !주사위 등)
         if command == 'roll':
@@ -255,13 +264,12 @@ def parse_input(content: str) -> Optional[Dict[str, Any]]:
     
     # 2. OOC 감지 - 메시지 내 (OOC: 내용) 패턴 추출
     # 메시지 어디에든 (OOC: ...) 가 있으면 추출
-    ooc_pattern = r'\((?:OOC|ooc)[:\s]+(.+?)\)'
-    ooc_match = re.search(ooc_pattern, clean_content, re.IGNORECASE | re.DOTALL)
+    ooc_match = OOC_INLINE_PATTERN.search(clean_content)
     
     if ooc_match:
         ooc_content = ooc_match.group(1).strip()
         # OOC 부분을 제거한 나머지 텍스트
-        remaining_text = re.sub(ooc_pattern, '', clean_content, flags=re.IGNORECASE | re.DOTALL).strip()
+        remaining_text = OOC_INLINE_PATTERN.sub('', clean_content).strip()
         
         if remaining_text:
             # OOC + 행동/대사가 함께 있음 → 둘 다 처리
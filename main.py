@@ -10,17 +10,74 @@ import logging
 import io
 import re
 import json
-from typing import Optional, Tuple, List
+import tempfile
+from typing import Optional, Tuple, List, Dict
 from dotenv import load_dotenv
 from google import genai
-from google.genai import types
+
+# 빠른 JSON 파싱 (없으면 표준 json 사용)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # =========================================================
 # 상수 정의
 # =========================================================
 MAX_DISCORD_MESSAGE_LENGTH = 2000
-SUPPORTED_TEXT_EXTENSIONS = ['.txt', '.md', '.json', '.log', '.py', '.yaml', '.yml']
+SUPPORTED_TEXT_EXTENSIONS = ('.txt', '.md', '.json', '.log', '.py', '.yaml', '.yml')
 VERSION = "3.1"
+# 새로 분석할 행동이 없는 맞장구 입력만 좌뇌 축약 분석 (짧아도 "공격", "도망" 같은 행동은 전체 분석)
+ACKNOWLEDGEMENT_INPUTS = frozenset({
+    '네', '넵', '넹', '예', '응', '웅', 'ㅇㅇ', 'ㅇㅋ', 'ㅋㅋ', 'ㅎㅎ',
+    'ok', 'okay', 'yes', '...', '…',
+})
+
+# 명령어/표시용 조회 테이블 (메시지마다 재생성하지 않도록 모듈 로드 시 1회 생성)
+TURN_COMMANDS = frozenset({'next', 'turn'})
+
+INFO_SUB_ALIASES = {
+    '캐릭터': 'character', 'char': 'character', 'character': 'character', 'c': 'character',
+    '관계': 'relation', 'rel': 'relation', 'relation': 'relation', 'r': 'relation',
+    '패시브': 'passive', 'passive': 'passive', 'p': 'passive', '칭호': 'passive',
+    '세계': 'world', 'world': 'world', 'w': 'world', '월드': 'world',
+}
+INFO_SHOW_CHARACTER = frozenset({'all', 'character'})
+INFO_SHOW_RELATION = frozenset({'all', 'relation'})
+INFO_SHOW_PASSIVE = frozenset({'all', 'passive'})
+INFO_SHOW_WORLD = frozenset({'all', 'world'})
+
+RULES_MODE_DISPLAY = {
+    "default": "📗 기본 룰",
+    "hybrid": "📘 기본 룰 + 커스텀",
+    "custom": "📙 완전 커스텀"
+}
+
+LORE_STAGE_NAMES = {
+    "splitting": "📂 청크 분할",
+    "compressing": "🗜️ 청크 압축",
+    "merging": "🔗 중간 병합",
+    "finalizing": "✨ 최종 통합"
+}
+
+OOC_FIELD_EMOJI = {
+    "relationships": "💞", "passives": "🏆", "known_info": "💡",
+    "foreshadowing": "🔮", "normalization": "🌓", "appearance": "👁️",
+    "personality": "💭", "background": "📖", "notes": "📋",
+    "inventory": "🎒", "economy": "💰", "status_effects": "💫"
+}
+
+# 우뇌 응답의 ```system_update {...}``` 블록 (파싱용 / 출력에서 제거용)
+SYSTEM_UPDATE_PATTERN = re.compile(r'```system_update\s*\n?\s*(\{.*?\})\s*\n?```', re.DOTALL)
+SYSTEM_UPDATE_STRIP_PATTERN = re.compile(r'\s*```system_update\s*\n?\s*\{.*?\}\s*\n?```\s*', re.DOTALL)
+
+NPC_SPEECH_HINTS = {
+    "hostile": "위협적, 조롱, 정보 숨김",
+    "unfriendly": "퉁명스럽고 짧음, 비협조",
+    "neutral": "정중하고 사무적",
+    "friendly": "따뜻하고 친근, 정보 제공",
+    "devoted": "존경/애정, 비밀 공유 가능"
+}
 
 # =========================================================
 # 모듈 임포트
@@ -80,23 +137,46 @@ intents = discord.Intents.default()
 intents.message_content = True
 client_discord = discord.Client(intents=intents)
 
+# 채널별 AI 응답 직렬화용 락 (같은 채널의 요청은 도착 순서대로 하나씩 처리)
+_channel_ai_locks: Dict[str, asyncio.Lock] = {}
+
+
+def get_channel_ai_lock(channel_id: str) -> asyncio.Lock:
+    """채널의 AI 응답 락을 반환합니다. (없으면 생성)"""
+    lock = _channel_ai_locks.get(channel_id)
+    if lock is None:
+        lock = _channel_ai_locks[channel_id] = asyncio.Lock()
+    return lock
+
 
 # =========================================================
 # 유틸리티 함수
 # =========================================================
-async def send_long_message(channel, text: str) -> None:
-    """2000자가 넘는 메시지를 나누어 전송하는 함수"""
+async def send_long_message(channel, text: str) -> Optional[discord.Message]:
+    """
+    Discord 길이 제한(MAX_DISCORD_MESSAGE_LENGTH)을 넘는 메시지를 나누어 전송하는 함수
+    
+    채널 내 순서가 보장되어야 하므로 조각은 순차 전송합니다.
+    (속도 제한은 discord.py의 HTTP 레이어가 처리)
+    대부분의 응답은 한 번에 전송되며, 긴 메시지만 인덱스를 옮겨가며 잘라 보냅니다.
+    
+    Returns:
+        마지막으로 전송된 메시지 (보낼 내용이 없으면 None)
+    """
     if not text:
-        return
+        return None
     
-    if len(text) <= MAX_DISCORD_MESSAGE_LENGTH:
-        await channel.send(text)
-        return
+    text_len = len(text)
+    if text_len <= MAX_DISCORD_MESSAGE_LENGTH:
+        return await channel.send(text)
     
     # 메시지 분할 전송
-    for i in range(0, len(text), MAX_DISCORD_MESSAGE_LENGTH):
-        chunk = text[i:i + MAX_DISCORD_MESSAGE_LENGTH]
-        await channel.send(chunk)
+    last_msg = None
+    i = 0
+    while i < text_len:
+        last_msg = await channel.send(text[i:i + MAX_DISCORD_MESSAGE_LENGTH])
+        i += MAX_DISCORD_MESSAGE_LENGTH
+    return last_msg
 
 
 async def read_attachment_text(attachment) -> Tuple[Optional[str], Optional[str]]:
@@ -109,7 +189,7 @@ async def read_attachment_text(attachment) -> Tuple[Optional[str], Optional[str]
     filename_lower = attachment.filename.lower()
     
     # 지원되는 확장자인지 확인
-    if not any(filename_lower.endswith(ext) for ext in SUPPORTED_TEXT_EXTENSIONS):
+    if not filename_lower.endswith(SUPPORTED_TEXT_EXTENSIONS):
         return None, f"⚠️ **지원하지 않는 파일입니다.**\n지원 확장자: {', '.join(SUPPORTED_TEXT_EXTENSIONS)}"
     
     try:
@@ -134,6 +214,12 @@ async def safe_delete_message(message) -> None:
         logging.warning(f"메시지 삭제 실패: {e}")
 
 
+def is_acknowledgement_input(content: str) -> bool:
+    """입력이 맞장구("네.", "ㅇㅇ~", "OK!" 등)뿐인지 확인합니다. (끝의 . ! ~ 와 대소문자 무시)"""
+    text = content.strip()
+    return (text.rstrip('.!~') or text).casefold() in ACKNOWLEDGEMENT_INPUTS
+
+
 # =========================================================
 # 명령어 핸들러
 # =========================================================
@@ -260,13 +346,7 @@ async def handle_lore_command(message, channel_id: str, arg: str) -> None:
             # 대용량 로어 처리
             if is_massive:
                 async def progress_callback(stage, current, total):
-                    stage_names = {
-                        "splitting": "📂 청크 분할",
-                        "compressing": "🗜️ 청크 압축",
-                        "merging": "🔗 중간 병합",
-                        "finalizing": "✨ 최종 통합"
-                    }
-                    stage_name = stage_names.get(stage, stage)
+                    stage_name = LORE_STAGE_NAMES.get(stage, stage)
                     await status_msg.edit(
                         content=f"📚 **[대용량 로어 처리 중]**\n"
                                 f"{stage_name}: {current}/{total}"
@@ -287,26 +367,26 @@ async def handle_lore_command(message, channel_id: str, arg: str) -> None:
                             f"• 방식: {metadata['method']}\n\n"
                             f"⏳ 장르/NPC 분석 중..."
                 )
+                
+                # 대용량일 경우 요약본으로 분석 (토큰 절약)
+                # 장르/NPC/위치 규칙을 한 번의 호출로 추출
+                res = await memory_system.analyze_lore_bundle(client_genai, MODEL_ID, summary)
             else:
-                await status_msg.edit(content="⏳ **[AI]** 세계관 압축 중...")
-                summary = await memory_system.compress_lore_core(client_genai, MODEL_ID, raw_lore)
+                # 일반 로어는 원본으로 분석하므로 압축과 장르/NPC 추출이 서로 독립적 → 동시 실행
+                await status_msg.edit(content="⏳ **[AI]** 세계관 압축 및 장르/NPC 데이터 추출 중...")
+                summary, res = await asyncio.gather(
+                    memory_system.compress_lore_core(client_genai, MODEL_ID, raw_lore),
+                    memory_system.analyze_lore_bundle(client_genai, MODEL_ID, raw_lore)
+                )
                 domain_manager.save_lore_summary(channel_id, summary)
             
-            # 장르 분석 (요약본 기반으로 수행 - 토큰 절약)
-            await status_msg.edit(content="⏳ **[AI]** 장르 및 NPC 데이터 추출 중...")
-            
-            # 대용량일 경우 요약본으로 분석, 아니면 원본으로
-            analysis_text = summary if is_massive else raw_lore
-            
-            res = await memory_system.analyze_genre_from_lore(client_genai, MODEL_ID, analysis_text)
             domain_manager.set_active_genres(channel_id, res.get("genres", ["noir"]))
             domain_manager.set_custom_tone(channel_id, res.get("custom_tone"))
             
-            npcs = await memory_system.analyze_npcs_from_lore(client_genai, MODEL_ID, analysis_text)
-            for n in npcs:
+            for n in res.get("npcs", []):
                 character_sheet.npc_memory.add_npc(channel_id, n.get("name"), n.get("description"))
             
-            rules = await memory_system.analyze_location_rules_from_lore(client_genai, MODEL_ID, analysis_text)
+            rules = res.get("rules")
             if rules:
                 domain_manager.set_location_rules(channel_id, rules)
             
@@ -372,15 +452,9 @@ async def handle_rule_command(message, channel_id: str, arg: str) -> None:
     
     # 룰 조회
     rules_mode = domain_manager.get_rules_mode(channel_id)
-    mode_display = {
-        "default": "📗 기본 룰",
-        "hybrid": "📘 기본 룰 + 커스텀",
-        "custom": "📙 완전 커스텀"
-    }
-    
     await send_long_message(
         message.channel,
-        f"**[{mode_display.get(rules_mode, '📘')}]**\n\n{domain_manager.get_rules(channel_id)}"
+        f"**[{RULES_MODE_DISPLAY.get(rules_mode, '📘')}]**\n\n{domain_manager.get_rules(channel_id)}"
     )
 
 
@@ -409,11 +483,16 @@ async def handle_chronicle_command(message, channel_id: str, arg: str) -> None:
             await message.channel.send(msg_text)
             return
         
-        # 로어도 함께 포함
+        # 로어도 함께 포함 (전체 문자열을 합치지 않고 조각별로 기록)
         lore = domain_manager.get_lore(channel_id)
-        content = f"=== LORE ===\n{lore}\n\n{ch}" if lore else ch
         
-        with io.BytesIO(content.encode('utf-8')) as f:
+        with tempfile.TemporaryFile(mode='w+b') as f:
+            if lore:
+                f.write(b"=== LORE ===\n")
+                f.write(lore.encode('utf-8'))
+                f.write(b"\n\n")
+            f.write(ch.encode('utf-8'))
+            f.seek(0)
             await message.channel.send(msg_text, file=discord.File(f, filename="chronicles.txt"))
         return
     
@@ -445,7 +524,9 @@ async def handle_npc_info_command(message, channel_id: str, npc_name: str) -> No
         await message.channel.send(f"⚠️ '{npc_name}'라는 NPC를 찾을 수 없습니다.")
 
 
-async def handle_info_command(message, channel_id: str, sub_command: str = "") -> None:
+async def handle_info_command(
+    message, channel_id: str, sub_command: str = "", domain_data: Optional[dict] = None
+) -> None:
     """
     통합 정보 명령어를 처리합니다.
     
@@ -455,9 +536,14 @@ async def handle_info_command(message, channel_id: str, sub_command: str = "") -
     - 관계: NPC 관계도
     - 패시브: 패시브, 칭호, 비일상 적응
     - 세계: 퀘스트, 메모, 세계상황, 복선, 아는 정보
+    
+    domain_data가 주어지면 해당 스냅샷만 사용합니다 (디스크 재조회 없음).
     """
+    if domain_data is None:
+        domain_data = domain_manager.get_domain(channel_id)
+    
     uid = str(message.author.id)
-    p = domain_manager.get_participant_data(channel_id, uid)
+    p = domain_data["participants"].get(uid)
     
     if not p:
         await message.channel.send("❌ 정보 없음. `!가면`으로 먼저 등록하세요.")
@@ -468,20 +554,14 @@ async def handle_info_command(message, channel_id: str, sub_command: str = "") -
     sub = sub_command.strip().lower()
     
     # 서브 명령어 별칭 매핑
-    sub_aliases = {
-        '캐릭터': 'character', 'char': 'character', 'character': 'character', 'c': 'character',
-        '관계': 'relation', 'rel': 'relation', 'relation': 'relation', 'r': 'relation',
-        '패시브': 'passive', 'passive': 'passive', 'p': 'passive', '칭호': 'passive',
-        '세계': 'world', 'world': 'world', 'w': 'world', '월드': 'world',
-    }
-    sub_type = sub_aliases.get(sub, 'all')
+    sub_type = INFO_SUB_ALIASES.get(sub, 'all')
     
     result = f"👤 **[{mask}]**\n\n"
     
     # =========================================================
     # 캐릭터 섹션: 외형, 성격, 배경, 소지품
     # =========================================================
-    if sub_type in ['all', 'character']:
+    if sub_type in INFO_SHOW_CHARACTER:
         result += "**━━━ 🎭 캐릭터 ━━━**\n"
         
         # 외형
@@ -535,7 +615,7 @@ async def handle_info_command(message, channel_id: str, sub_command: str = "") -
     # =========================================================
     # 관계 섹션: NPC 관계도
     # =========================================================
-    if sub_type in ['all', 'relation']:
+    if sub_type in INFO_SHOW_RELATION:
         result += "**━━━ 💞 관계 ━━━**\n"
         
         relationships = ai_mem.get('relationships', {})
@@ -550,7 +630,7 @@ async def handle_info_command(message, channel_id: str, sub_command: str = "") -
     # =========================================================
     # 패시브 섹션: 패시브, 칭호, 비일상 적응
     # =========================================================
-    if sub_type in ['all', 'passive']:
+    if sub_type in INFO_SHOW_PASSIVE:
         result += "**━━━ 🏆 패시브/칭호 ━━━**\n"
         
         passives = ai_mem.get('passives', [])
@@ -572,11 +652,13 @@ async def handle_info_command(message, channel_id: str, sub_command: str = "") -
     # =========================================================
     # 세계 섹션: 퀘스트, 메모, 세계상황, 복선, 아는 정보
     # =========================================================
-    if sub_type in ['all', 'world']:
+    if sub_type in INFO_SHOW_WORLD:
         result += "**━━━ 🌍 세계 ━━━**\n"
         
+        board = domain_data.get('quest_board') or {}
+        
         # 퀘스트
-        quests = quest_manager.get_active_quests(channel_id)
+        quests = board.get('active', [])
         if quests:
             result += "📜 **활성 퀘스트:**\n"
             for q in quests[:5]:
@@ -585,7 +667,7 @@ async def handle_info_command(message, channel_id: str, sub_command: str = "") -
                 result += f"  _... 외 {len(quests) - 5}개_\n"
         
         # 메모
-        memos = quest_manager.get_memos(channel_id)
+        memos = board.get('memos', [])
         if memos:
             result += "📝 **메모:**\n"
             for m in memos[:5]:
@@ -608,7 +690,7 @@ async def handle_info_command(message, channel_id: str, sub_command: str = "") -
                 result += f"  • {fs}\n"
         
         # 세션 AI 메모리 (세계 상황)
-        session_mem = domain_manager.get_session_ai_memory(channel_id)
+        session_mem = domain_data.get('ai_session_memory', {})
         if session_mem:
             current_arc = session_mem.get('current_arc', '')
             if current_arc:
@@ -708,12 +790,12 @@ async def on_message(message):
         # 봇 On/Off 명령어
         if message.content == "!off":
             domain_manager.set_bot_disabled(channel_id, True)
-            await message.channel.send("🔇 Off")
+            await message.add_reaction("🔇")
             return
         
         if message.content == "!on":
             domain_manager.set_bot_disabled(channel_id, False)
-            await message.channel.send("🔊 On")
+            await message.add_reaction("🔊")
             return
         
         # 봇이 비활성화된 경우 무시
@@ -730,10 +812,8 @@ async def on_message(message):
         # =========================================================
         # 보안: 참가자 및 잠금 확인
         # =========================================================
-        is_participant = domain_manager.get_participant_data(
-            channel_id, str(message.author.id)
-        ) is not None
         domain_data = domain_manager.get_domain(channel_id)
+        is_participant = str(message.author.id) in domain_data["participants"]
         is_locked = domain_data['settings'].get('session_locked', False)
         
         # 비참가자가 사용 가능한 명령어
@@ -835,12 +915,12 @@ async def on_message(message):
             
             if cmd == 'unlock':
                 domain_manager.set_session_lock(channel_id, False)
-                await message.channel.send("🔓 **잠금 해제**")
+                await message.add_reaction("🔓")
                 return
             
             if cmd == 'lock':
                 domain_manager.set_session_lock(channel_id, True)
-                await message.channel.send("🔒 **세션 잠금**")
+                await message.add_reaction("🔒")
                 return
             
             # --- 로어 명령어 ---
@@ -872,7 +952,7 @@ async def on_message(message):
                 return
             
             # --- 진행/턴 ---
-            if cmd in ['next', 'turn']:
+            if cmd in TURN_COMMANDS:
                 system_trigger = "[System: 기록된 모든 플레이어 행동을 종합하여 다음 장면을 진행하세요. 각 캐릭터의 행동과 침묵 모두 고려하여 서사적으로 진행하세요.]"
                 await message.add_reaction("🎬")
             
@@ -884,8 +964,8 @@ async def on_message(message):
                 if status == "left":
                     domain_manager.update_participant(channel_id, message.author, True)
                     await message.channel.send("🆕 환생 완료")
-                
-                domain_manager.update_participant(channel_id, message.author)
+                else:
+                    domain_manager.update_participant(channel_id, message.author)
                 domain_manager.set_user_mask(channel_id, message.author.id, target)
                 await message.channel.send(f"🎭 가면: {target}")
                 return
@@ -895,12 +975,12 @@ async def on_message(message):
                 domain_manager.set_user_description(
                     channel_id, message.author.id, parsed['content']
                 )
-                await message.channel.send("📝 저장됨")
+                await message.add_reaction("📝")
                 return
             
             if cmd == 'info':
                 sub_cmd = parsed['content'].strip()
-                await handle_info_command(message, channel_id, sub_cmd)
+                await handle_info_command(message, channel_id, sub_cmd, domain_data)
                 return
             
             # --- 퀘스트/메모 직접 명령어 ---
@@ -931,19 +1011,19 @@ async def on_message(message):
             # --- 참가자 상태 ---
             if cmd == 'afk':
                 domain_manager.set_participant_status(channel_id, message.author.id, "afk")
-                await message.channel.send("💤")
+                await message.add_reaction("💤")
                 return
             
             if cmd == 'leave':
                 domain_manager.set_participant_status(
                     channel_id, message.author.id, "left", "이탈"
                 )
-                await message.channel.send("🚪")
+                await message.add_reaction("🚪")
                 return
             
             if cmd == 'back':
                 domain_manager.update_participant(channel_id, message.author)
-                await message.channel.send("✨")
+                await message.add_reaction("✨")
                 return
             
             # --- 룰 명령어 ---
@@ -1174,13 +1254,7 @@ async def on_message(message):
                 interpretation = edit_result.get("interpretation", "")
                 
                 edited_fields = list(set(e.get("field", "").split(".")[0] for e in edit_result["edits"]))
-                field_emoji = {
-                    "relationships": "💞", "passives": "🏆", "known_info": "💡",
-                    "foreshadowing": "🔮", "normalization": "🌓", "appearance": "👁️",
-                    "personality": "💭", "background": "📖", "notes": "📋",
-                    "inventory": "🎒", "economy": "💰", "status_effects": "💫"
-                }
-                fields_str = " ".join([field_emoji.get(f, "📝") for f in edited_fields])
+                fields_str = " ".join([OOC_FIELD_EMOJI.get(f, "📝") for f in edited_fields])
                 
                 await safe_delete_message(wait_msg)
                 await message.channel.send(
@@ -1241,13 +1315,7 @@ async def on_message(message):
                         ooc_applied = True
                         
                         edited_fields = list(set(e.get("field", "").split(".")[0] for e in edit_result["edits"]))
-                        field_emoji = {
-                            "relationships": "💞", "passives": "🏆", "known_info": "💡",
-                            "foreshadowing": "🔮", "normalization": "🌓", "appearance": "👁️",
-                            "personality": "💭", "background": "📖", "notes": "📋",
-                            "inventory": "🎒", "economy": "💰", "status_effects": "💫"
-                        }
-                        fields_str = " ".join([field_emoji.get(f, "📝") for f in edited_fields])
+                        fields_str = " ".join([OOC_FIELD_EMOJI.get(f, "📝") for f in edited_fields])
                         await message.channel.send(f"✅ **[OOC 적용]** {fields_str}")
                 except Exception as e:
                     logging.warning(f"OOC 적용 실패: {e}")
@@ -1269,66 +1337,95 @@ async def on_message(message):
         if not domain_data['settings'].get('session_locked', False) and not system_trigger:
             return
         
-        async with message.channel.typing():
-            if not domain_manager.update_participant(channel_id, message.author):
-                return
+        # 같은 채널의 AI 응답은 FIFO로 하나씩 처리 (채널 간에는 병렬)
+        async with get_channel_ai_lock(channel_id), message.channel.typing():
+            uid = str(message.author.id)
             
-            user_mask = domain_manager.get_user_mask(channel_id, message.author.id)
+            # 메시지 초입의 스냅샷으로 이미 등록된 참가자면 등록 단계(디스크 읽기)를 생략
+            if system_trigger or not domain_manager.is_participant_current(
+                domain_data["participants"].get(uid)
+            ):
+                if not domain_manager.update_participant(channel_id, message.author):
+                    return
+            
+            # 잠금 대기 중 다른 턴이 기록했을 수 있으므로 스냅샷을 한 번만 다시 읽어 이 분기 전체에서 재사용
+            domain_data = domain_manager.get_domain(channel_id)
+            p_data = domain_data["participants"].get(uid)
+            
+            user_mask = (p_data or {}).get("mask", "Unknown")
             action_text = system_trigger if system_trigger else f"[{user_mask}]: {parsed['content']}"
             
             # 대기 모드에서는 기록만 하고 AI 응답 생성 안 함
-            response_mode = domain_manager.get_response_mode(channel_id)
+            response_mode = domain_data["settings"].get("response_mode", "auto")
             if response_mode == 'waiting' and not system_trigger:
                 domain_manager.append_history(channel_id, "User", action_text)
                 await message.add_reaction("✏️")
                 return
             
-            # 컨텍스트 수집
-            summary = domain_manager.get_lore_summary(channel_id)
-            lore_txt = summary if summary else domain_manager.get_lore(channel_id)
-            rule_txt = domain_manager.get_rules(channel_id)
-            world_ctx = world_manager.get_world_context(channel_id)
-            obj_ctx = quest_manager.get_objective_context(channel_id)
-            active_genres = domain_manager.get_active_genres(channel_id)
-            custom_tone = domain_manager.get_custom_tone(channel_id)
+            # 컨텍스트 수집 (로어/룰 파일 읽기는 이벤트 루프 밖에서)
+            lore_txt, rule_txt = await asyncio.to_thread(domain_manager.get_lore_and_rules, channel_id)
+            active_genres = domain_data.get("active_genres", ["noir"])
+            custom_tone = domain_data.get("custom_tone")
             
             history = domain_data.get('history', [])[-10:]
             hist_text = "\n".join([f"{h['role']}: {h['content']}" for h in history])
             hist_text += f"\nUser: {action_text}"
             
-            active_quests = domain_manager.get_quest_board(channel_id).get("active", [])
+            active_quests = (domain_data.get("quest_board") or {}).get("active", [])
             quest_txt = " | ".join(active_quests) if active_quests else "None"
             
             # 플레이어 컨텍스트 수집 (패시브 중복 방지용)
-            uid = str(message.author.id)
-            p_data = domain_manager.get_participant_data(channel_id, uid)
             player_context = ""
             if p_data:
                 player_context = simulation_manager.get_passives_for_context(p_data)
             
             # AI 분석 (좌뇌)
-            nvc_res = {}
-            if client_genai:
-                nvc_res = await memory_system.analyze_context_nvc(
+            # 히스토리가 없는 첫 장면은 NPC 태도/경험/패시브를 분석할 근거가 없고,
+            # 맞장구 입력(ACKNOWLEDGEMENT_INPUTS)은 새로 분석할 행동이 없으므로 축약 분석
+            is_acknowledgement = not system_trigger and is_acknowledgement_input(parsed.get('content', ''))
+            nvc_level = (
+                memory_system.NVC_LEVEL_FULL if history and not is_acknowledgement
+                else memory_system.NVC_LEVEL_MINIMAL
+            )
+            # 좌뇌 분석(API 왕복)과 세계/퀘스트 컨텍스트 읽기(디스크)를 동시에 진행
+            # 세계/퀘스트 컨텍스트는 기존과 같이 이번 분석 결과 반영 전 상태를 사용
+            context_tasks = [
+                asyncio.to_thread(world_manager.get_world_context, channel_id),
+                asyncio.to_thread(quest_manager.get_objective_context, channel_id),
+            ]
+            # 시스템 트리거(!시작/!진행)인데 분석할 플레이어 기록이 거의 없으면 좌뇌 분석 생략
+            skip_nvc = bool(system_trigger) and len(history) < 2
+            if client_genai and not skip_nvc:
+                context_tasks.append(memory_system.analyze_context_nvc(
                     client_genai, MODEL_ID, hist_text, lore_txt, rule_txt, quest_txt,
-                    player_context=player_context
-                )
-                
-                if nvc_res.get("CurrentLocation"):
-                    domain_manager.set_current_location(channel_id, nvc_res["CurrentLocation"])
-                if nvc_res.get("LocationRisk"):
-                    domain_manager.set_current_risk(channel_id, nvc_res["LocationRisk"])
+                    player_context=player_context, level=nvc_level
+                ))
+            world_ctx, obj_ctx, *nvc_results = await asyncio.gather(*context_tasks)
+            
+            nvc_res = nvc_results[0] if nvc_results else {}
+            # 분석 실패 시 "Unknown" 기본값으로 위치/위험도/메모리를 덮어쓰지 않음
+            nvc_failed = memory_system.is_nvc_failed(nvc_res)
+            if nvc_results and not nvc_failed:
+                # 위치/위험도는 한 번의 읽기/쓰기로 반영
+                if nvc_res.get("CurrentLocation") or nvc_res.get("LocationRisk"):
+                    with domain_manager.domain_transaction(channel_id) as d:
+                        if nvc_res.get("CurrentLocation"):
+                            d["world_state"]["current_location"] = nvc_res["CurrentLocation"]
+                        if nvc_res.get("LocationRisk"):
+                            d["world_state"]["risk_level"] = nvc_res["LocationRisk"]
             
             # 시스템 액션 처리
             sys_action = nvc_res.get("SystemAction", {})
             auto_msg = await process_ai_system_action(message, channel_id, sys_action)
             
             # === AI 메모리 자동 갱신 (하이브리드 시스템) ===
-            memory_msgs = memory_system.apply_ai_memory_updates(
+            # 세션 파일을 읽고-고치고-쓰는 작업이므로 이벤트 루프에서 실행
+            # (같은 채널의 다른 명령 처리도 루프에서 저장하므로, 스레드로 보내면 서로의 갱신을 덮어씀)
+            memory_msgs = [] if nvc_failed else memory_system.apply_ai_memory_updates(
                 channel_id, uid, nvc_res, domain_manager
             )
             
-            # AI 메모리 컨텍스트 생성 (우뇌에게 전달)
+            # AI 메모리 컨텍스트 생성 (우뇌에게 전달) - 기본값 보정 시 저장하므로 역시 루프에서 실행
             ai_memory_ctx = domain_manager.get_full_ai_context(channel_id, uid)
             
             # Temporal Orientation 추출
@@ -1347,21 +1444,16 @@ async def on_message(message):
             npc_attitudes = nvc_res.get("NPCAttitudes", {})
             npc_attitude_ctx = ""
             if npc_attitudes:
-                npc_attitude_ctx = "### [NPC ATTITUDES]\n"
+                attitude_lines = []
                 for npc_name, attitude_data in npc_attitudes.items():
-                    if isinstance(attitude_data, dict):
-                        att = attitude_data.get("attitude", "neutral")
-                        reason = attitude_data.get("reason", "")
-                        speech_hints = {
-                            "hostile": "위협적, 조롱, 정보 숨김",
-                            "unfriendly": "퉁명스럽고 짧음, 비협조",
-                            "neutral": "정중하고 사무적",
-                            "friendly": "따뜻하고 친근, 정보 제공",
-                            "devoted": "존경/애정, 비밀 공유 가능"
-                        }
-                        hint = speech_hints.get(att, "")
-                        npc_attitude_ctx += f"- **{npc_name}**: {att} ({reason}) → 말투: {hint}\n"
-                npc_attitude_ctx += "\n"
+                    if not isinstance(attitude_data, dict):
+                        continue
+                    att = attitude_data.get("attitude", "neutral")
+                    attitude_lines.append(
+                        f"- **{npc_name}**: {att} ({attitude_data.get('reason', '')}) "
+                        f"→ 말투: {NPC_SPEECH_HINTS.get(att, '')}"
+                    )
+                npc_attitude_ctx = "### [NPC ATTITUDES]\n" + "\n".join(attitude_lines)
             
             # NPC간 대화 컨텍스트 생성
             npc_interaction = nvc_res.get("NPCInteraction")
@@ -1485,12 +1577,10 @@ Track each player separately. 3rd person narration. Korean output."""
                         character_descriptions=""
                     )
                 
-                # 히스토리 추가
-                for h in domain_data.get('history', []):
-                    role = "user" if h['role'] == "User" else "model"
-                    session.history.append(
-                        types.Content(role=role, parts=[types.Part(text=h['content'])])
-                    )
+                # 히스토리 추가 (이전 턴에 변환한 Content는 재사용)
+                session.extend_history(
+                    persona.build_history_contents(channel_id, domain_data.get('history', []))
+                )
                 
                 # 응답 생성
                 response = await persona.generate_response_with_retry(
@@ -1501,167 +1591,146 @@ Track each player separately. 3rd person narration. Korean output."""
                 
                 # === 우뇌 응답에서 SYSTEM_UPDATE 파싱 ===
                 if response:
-                    system_update_match = re.search(
-                        r'```system_update\s*\n?\s*(\{.*?\})\s*\n?```',
-                        response,
-                        re.DOTALL
-                    )
+                    system_update_match = SYSTEM_UPDATE_PATTERN.search(response)
                     
                     if system_update_match:
                         try:
-                            update_json = json.loads(system_update_match.group(1))
+                            update_text = system_update_match.group(1)
+                            update_json = orjson.loads(update_text) if orjson is not None else json.loads(update_text)
                             
-                            p_data = domain_manager.get_participant_data(channel_id, uid)
-                            ai_mem = domain_manager.get_ai_memory(channel_id, uid)
+                            update_msgs = []
                             
-                            if p_data and ai_mem:
-                                update_msgs = []
-                                p_updated = False
-                                mem_updated = False
-                                
-                                # ========== 참가자 데이터 (p_data) ==========
-                                
-                                # 인벤토리 추가
-                                if update_json.get("inventory_add"):
-                                    if "inventory" not in p_data:
-                                        p_data["inventory"] = {}
-                                    for item, amount in update_json["inventory_add"].items():
-                                        p_data["inventory"][item] = p_data["inventory"].get(item, 0) + int(amount)
-                                        update_msgs.append(f"🎒 **+{item}**")
-                                    p_updated = True
-                                
-                                # 인벤토리 제거
-                                if update_json.get("inventory_remove"):
-                                    if "inventory" not in p_data:
-                                        p_data["inventory"] = {}
-                                    for item, amount in update_json["inventory_remove"].items():
-                                        if item in p_data["inventory"]:
-                                            p_data["inventory"][item] = max(0, p_data["inventory"][item] - int(amount))
-                                            if p_data["inventory"][item] <= 0:
-                                                del p_data["inventory"][item]
-                                            update_msgs.append(f"🎒 **-{item}**")
-                                    p_updated = True
-                                
-                                # 골드 변경
-                                if update_json.get("gold_change") is not None:
-                                    if "economy" not in p_data:
-                                        p_data["economy"] = {"gold": 0}
-                                    change = int(update_json["gold_change"])
-                                    p_data["economy"]["gold"] = max(0, p_data["economy"].get("gold", 0) + change)
-                                    if change > 0:
-                                        update_msgs.append(f"💰 **+{change}**")
-                                    elif change < 0:
-                                        update_msgs.append(f"💰 **{change}**")
-                                    p_updated = True
-                                
-                                # 상태이상 추가
-                                if update_json.get("status_add"):
-                                    if "status_effects" not in p_data:
-                                        p_data["status_effects"] = []
-                                    for status in update_json["status_add"]:
-                                        if status not in p_data["status_effects"]:
-                                            p_data["status_effects"].append(status)
-                                            update_msgs.append(f"💫 **{status}**")
-                                    p_updated = True
-                                
-                                # 상태이상 제거
-                                if update_json.get("status_remove"):
-                                    if "status_effects" not in p_data:
-                                        p_data["status_effects"] = []
-                                    for status in update_json["status_remove"]:
-                                        if status in p_data["status_effects"]:
-                                            p_data["status_effects"].remove(status)
-                                            update_msgs.append(f"✨ **{status} 해제**")
-                                    p_updated = True
-                                
-                                # ========== AI 메모리 (ai_mem) ==========
-                                
-                                # 관계 업데이트
-                                if update_json.get("relationship_update"):
-                                    if "relationships" not in ai_mem:
-                                        ai_mem["relationships"] = {}
-                                    for npc, desc in update_json["relationship_update"].items():
-                                        ai_mem["relationships"][npc] = desc
-                                        update_msgs.append(f"💞 **{npc}**")
-                                    mem_updated = True
-                                
-                                # 패시브 추가
-                                if update_json.get("passive_add"):
-                                    if "passives" not in ai_mem:
-                                        ai_mem["passives"] = []
-                                    for passive in update_json["passive_add"]:
-                                        if passive not in ai_mem["passives"]:
-                                            ai_mem["passives"].append(passive)
-                                            update_msgs.append(f"🏆 **{passive}**")
-                                    mem_updated = True
-                                
-                                # 알고있는 정보 추가
-                                if update_json.get("info_add"):
-                                    if "known_info" not in ai_mem:
-                                        ai_mem["known_info"] = []
-                                    for info in update_json["info_add"]:
-                                        if info not in ai_mem["known_info"]:
-                                            ai_mem["known_info"].append(info)
-                                            update_msgs.append(f"💡 **정보**")
-                                    mem_updated = True
-                                
-                                # 복선 추가
-                                if update_json.get("foreshadow_add"):
-                                    if "foreshadowing" not in ai_mem:
-                                        ai_mem["foreshadowing"] = []
-                                    for fs in update_json["foreshadow_add"]:
-                                        if fs not in ai_mem["foreshadowing"]:
-                                            ai_mem["foreshadowing"].append(fs)
-                                            update_msgs.append(f"🔮 **복선**")
-                                    mem_updated = True
-                                
-                                # 적응도 업데이트
-                                if update_json.get("adaptation_update"):
-                                    if "normalization" not in ai_mem:
-                                        ai_mem["normalization"] = {}
-                                    for element, status in update_json["adaptation_update"].items():
-                                        ai_mem["normalization"][element] = status
-                                        update_msgs.append(f"🌓 **{element}**")
-                                    mem_updated = True
+                            # 참가자 데이터와 AI 메모리를 한 번 읽고, 블록 종료 시 한 번만 저장
+                            with domain_manager.participant_transaction(channel_id, uid) as p_data:
+                                ai_mem = p_data.get("ai_memory") if p_data else None
                                 
-                                # 동행자/펫 추가 (known_info에 저장, 외형에 넣지 않음!)
-                                if update_json.get("companion_add"):
-                                    if "known_info" not in ai_mem:
-                                        ai_mem["known_info"] = []
-                                    companions = update_json["companion_add"]
+                                if p_data and ai_mem:
+                                    # ========== 참가자 데이터 (p_data) ==========
                                     
-                                    # dict 형태: {"Shadow": "loyal wolf"}
-                                    if isinstance(companions, dict):
-                                        for name, desc in companions.items():
-                                            companion_info = f"동행자: {name} - {desc}"
-                                            if companion_info not in ai_mem["known_info"]:
-                                                ai_mem["known_info"].append(companion_info)
-                                                update_msgs.append(f"🐾 **{name}**")
-                                    # list 형태: ["Shadow the wolf"]
-                                    elif isinstance(companions, list):
-                                        for companion in companions:
-                                            if companion:
-                                                companion_info = f"동행자: {companion}"
+                                    # 인벤토리 추가
+                                    if update_json.get("inventory_add"):
+                                        if "inventory" not in p_data:
+                                            p_data["inventory"] = {}
+                                        for item, amount in update_json["inventory_add"].items():
+                                            p_data["inventory"][item] = p_data["inventory"].get(item, 0) + int(amount)
+                                            update_msgs.append(f"🎒 **+{item}**")
+                                    
+                                    # 인벤토리 제거
+                                    if update_json.get("inventory_remove"):
+                                        if "inventory" not in p_data:
+                                            p_data["inventory"] = {}
+                                        for item, amount in update_json["inventory_remove"].items():
+                                            if item in p_data["inventory"]:
+                                                p_data["inventory"][item] = max(0, p_data["inventory"][item] - int(amount))
+                                                if p_data["inventory"][item] <= 0:
+                                                    del p_data["inventory"][item]
+                                                update_msgs.append(f"🎒 **-{item}**")
+                                    
+                                    # 골드 변경
+                                    if update_json.get("gold_change") is not None:
+                                        if "economy" not in p_data:
+                                            p_data["economy"] = {"gold": 0}
+                                        change = int(update_json["gold_change"])
+                                        p_data["economy"]["gold"] = max(0, p_data["economy"].get("gold", 0) + change)
+                                        if change > 0:
+                                            update_msgs.append(f"💰 **+{change}**")
+                                        elif change < 0:
+                                            update_msgs.append(f"💰 **{change}**")
+                                    
+                                    # 상태이상 추가
+                                    if update_json.get("status_add"):
+                                        if "status_effects" not in p_data:
+                                            p_data["status_effects"] = []
+                                        for status in update_json["status_add"]:
+                                            if status not in p_data["status_effects"]:
+                                                p_data["status_effects"].append(status)
+                                                update_msgs.append(f"💫 **{status}**")
+                                    
+                                    # 상태이상 제거
+                                    if update_json.get("status_remove"):
+                                        if "status_effects" not in p_data:
+                                            p_data["status_effects"] = []
+                                        for status in update_json["status_remove"]:
+                                            if status in p_data["status_effects"]:
+                                                p_data["status_effects"].remove(status)
+                                                update_msgs.append(f"✨ **{status} 해제**")
+                                    
+                                    # ========== AI 메모리 (ai_mem) ==========
+                                    
+                                    # 관계 업데이트
+                                    if update_json.get("relationship_update"):
+                                        if "relationships" not in ai_mem:
+                                            ai_mem["relationships"] = {}
+                                        for npc, desc in update_json["relationship_update"].items():
+                                            ai_mem["relationships"][npc] = desc
+                                            update_msgs.append(f"💞 **{npc}**")
+                                    
+                                    # 패시브 추가
+                                    if update_json.get("passive_add"):
+                                        if "passives" not in ai_mem:
+                                            ai_mem["passives"] = []
+                                        for passive in update_json["passive_add"]:
+                                            if passive not in ai_mem["passives"]:
+                                                ai_mem["passives"].append(passive)
+                                                update_msgs.append(f"🏆 **{passive}**")
+                                    
+                                    # 알고있는 정보 추가
+                                    if update_json.get("info_add"):
+                                        if "known_info" not in ai_mem:
+                                            ai_mem["known_info"] = []
+                                        for info in update_json["info_add"]:
+                                            if info not in ai_mem["known_info"]:
+                                                ai_mem["known_info"].append(info)
+                                                update_msgs.append(f"💡 **정보**")
+                                    
+                                    # 복선 추가
+                                    if update_json.get("foreshadow_add"):
+                                        if "foreshadowing" not in ai_mem:
+                                            ai_mem["foreshadowing"] = []
+                                        for fs in update_json["foreshadow_add"]:
+                                            if fs not in ai_mem["foreshadowing"]:
+                                                ai_mem["foreshadowing"].append(fs)
+                                                update_msgs.append(f"🔮 **복선**")
+                                    
+                                    # 적응도 업데이트
+                                    if update_json.get("adaptation_update"):
+                                        if "normalization" not in ai_mem:
+                                            ai_mem["normalization"] = {}
+                                        for element, status in update_json["adaptation_update"].items():
+                                            ai_mem["normalization"][element] = status
+                                            update_msgs.append(f"🌓 **{element}**")
+                                    
+                                    # 동행자/펫 추가 (known_info에 저장, 외형에 넣지 않음!)
+                                    if update_json.get("companion_add"):
+                                        if "known_info" not in ai_mem:
+                                            ai_mem["known_info"] = []
+                                        companions = update_json["companion_add"]
+                                        
+                                        # dict 형태: {"Shadow": "loyal wolf"}
+                                        if isinstance(companions, dict):
+                                            for name, desc in companions.items():
+                                                companion_info = f"동행자: {name} - {desc}"
                                                 if companion_info not in ai_mem["known_info"]:
                                                     ai_mem["known_info"].append(companion_info)
-                                                    update_msgs.append(f"🐾 **{companion}**")
-                                    # string 형태: "Shadow"
-                                    elif isinstance(companions, str):
-                                        companion_info = f"동행자: {companions}"
-                                        if companion_info not in ai_mem["known_info"]:
-                                            ai_mem["known_info"].append(companion_info)
-                                            update_msgs.append(f"🐾 **{companions}**")
-                                    mem_updated = True
-                                
-                                # 저장
-                                if p_updated:
-                                    domain_manager.save_participant_data(channel_id, uid, p_data)
-                                if mem_updated:
-                                    domain_manager.update_ai_memory(channel_id, uid, ai_mem)
-                                
-                                # 업데이트 메시지 출력
-                                if update_msgs:
-                                    await message.channel.send(" | ".join(update_msgs))
+                                                    update_msgs.append(f"🐾 **{name}**")
+                                        # list 형태: ["Shadow the wolf"]
+                                        elif isinstance(companions, list):
+                                            for companion in companions:
+                                                if companion:
+                                                    companion_info = f"동행자: {companion}"
+                                                    if companion_info not in ai_mem["known_info"]:
+                                                        ai_mem["known_info"].append(companion_info)
+                                                        update_msgs.append(f"🐾 **{companion}**")
+                                        # string 형태: "Shadow"
+                                        elif isinstance(companions, str):
+                                            companion_info = f"동행자: {companions}"
+                                            if companion_info not in ai_mem["known_info"]:
+                                                ai_mem["known_info"].append(companion_info)
+                                                update_msgs.append(f"🐾 **{companions}**")
+                            
+                            # 업데이트 메시지 출력
+                            if update_msgs:
+                                await message.channel.send(" | ".join(update_msgs))
                         
                         except json.JSONDecodeError as je:
                             logging.warning(f"[SYSTEM_UPDATE] JSON 파싱 실패: {je}")
@@ -1669,12 +1738,7 @@ Track each player separately. 3rd person narration. Korean output."""
                             logging.warning(f"[SYSTEM_UPDATE] 업데이트 실패: {ue}")
                         
                         # 응답에서 system_update 블록 제거 (출력에서 숨김)
-                        response = re.sub(
-                            r'\s*```system_update\s*\n?\s*\{.*?\}\s*\n?```\s*',
-                            '',
-                            response,
-                            flags=re.DOTALL
-                        ).strip()
+                        response = SYSTEM_UPDATE_STRIP_PATTERN.sub('', response).strip()
                 
                 # 응답 길이 로깅
                 if response:
@@ -1691,8 +1755,9 @@ Track each player separately. 3rd person narration. Korean output."""
             
             if response:
                 await send_long_message(message.channel, response)
-                domain_manager.append_history(channel_id, "User", action_text)
-                domain_manager.append_history(channel_id, "Char", response)
+                domain_manager.append_history_batch(
+                    channel_id, [("User", action_text), ("Char", response)]
+                )
                 
                 # === 자동 발효 시스템 (장기 기억 관리) ===
                 try:
@@ -1704,7 +1769,7 @@ Track each player separately. 3rd person narration. Korean output."""
                         logging.info(f"[Fermentation] 자동 발효 시작 - {channel_id}")
                         await fermentation.auto_ferment(
                             client_genai, MODEL_ID, session_data,
-                            save_callback=lambda: domain_manager.save_domain(channel_id, session_data)
+                            transaction=lambda: domain_manager.domain_transaction(channel_id)
                         )
                 except Exception as fe:
                     logging.warning(f"[Fermentation] 자동 발효 실패 (무시됨): {fe}")
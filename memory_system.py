@@ -40,16 +40,46 @@ Left Hemisphere Principles:
 
 import json
 import asyncio
+import copy
+import functools
+import hashlib
 import logging
+import os
+import random
 import re
+import unicodedata
+from collections import OrderedDict
+from enum import IntEnum
 from typing import Optional, Dict, Any, List, Callable, TypeVar, Tuple
 from google.genai import types
 
+# 빠른 JSON 파싱 (없으면 표준 json 사용)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 키워드 다중 매칭 (없으면 키워드별 부분 문자열 검사로 폴백)
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # =========================================================
 # 상수 정의
 # =========================================================
 MAX_RETRY_COUNT = 3
-RETRY_DELAY_SECONDS = 1
+RETRY_DELAY_SECONDS = 1  # 첫 재시도 대기 (이후 2배씩 증가)
+MAX_RETRY_DELAY_SECONDS = 8
+RETRY_JITTER_SECONDS = 0.5
+# 일시적 오류로 보고 재시도하는 HTTP 상태 코드 (그 외 4xx는 재시도해도 같은 결과)
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+# NVC 헤지 요청: NVC_HEDGE=1이면 첫 요청이 이 시간 안에 끝나지 않을 때 같은 요청을 하나 더 보냄
+NVC_HEDGE_DELAY_SECONDS = 0.8
+MAX_CONCURRENT_API_CALLS = 8  # 좌뇌 분석 호출 동시 실행 상한 (429 방지)
+
+# 모든 좌뇌 API 호출이 공유하는 동시 실행 제한
+_api_semaphore = asyncio.Semaphore(MAX_CONCURRENT_API_CALLS)
 
 # =========================================================
 # WORLD CONSTRAINTS EXTRACTION (세계 제약 추출)
@@ -279,70 +309,166 @@ SUPPORTED_GENRES = [
     'superhero', 'space_opera', 'western', 'occult', 'military'
 ]
 
-# 장르별 키워드 맵 (한국어 포함)
+# 장르별 키워드 맵 (한국어 포함) - 읽기 전용이므로 튜플로 보관
 GENRE_KEYWORD_MAP = {
-    "high_fantasy": [
+    "high_fantasy": (
         "dragon", "elf", "orc", "magic", "wizard", "spell", "kingdom", 
         "mana", "legion", "드래곤", "엘프", "마법", "왕국", "하이판타지", "판타지"
-    ],
-    "steampunk": [
+    ),
+    "steampunk": (
         "steam", "gear", "brass", "industrial", "engine", "victorian", 
         "clockwork", "airship", "스팀", "증기", "톱니", "기관"
-    ],
-    "cyberpunk": [
+    ),
+    "cyberpunk": (
         "cyber", "neon", "hacker", "corp", "implant", "android", 
         "chrome", "사이버", "해커", "네온", "임플란트"
-    ],
-    "wuxia": [
+    ),
+    "wuxia": (
         "murim", "cultivation", "sect", "qi", "martial", "jianghu", 
         "무협", "무림", "강호", "내공", "문파"
-    ],
-    "cosmic_horror": [
+    ),
+    "cosmic_horror": (
         "cthulhu", "eldritch", "sanity", "cult", "madness", "ancient one", 
         "크툴루", "코즈믹", "광기", "고대신"
-    ],
-    "post_apocalypse": [
+    ),
+    "post_apocalypse": (
         "wasteland", "radiation", "ruins", "survival", "scavenge", "mutant", 
         "아포칼립스", "황무지", "방사능", "폐허"
-    ],
-    "urban_fantasy": [
+    ),
+    "urban_fantasy": (
         "modern magic", "masquerade", "secret society", "vampire", "hunter", 
         "어반", "이능", "뱀파이어", "헌터"
-    ],
-    "school_life": [
+    ),
+    "school_life": (
         "school", "academy", "student", "class", "club", "campus",
         "학교", "학생", "학원", "동아리"
-    ],
-    "superhero": [
+    ),
+    "superhero": (
         "superhero", "villain", "superpower", "costume", "justice", "hero", 
         "히어로", "초능력", "빌런"
-    ],
-    "space_opera": [
+    ),
+    "space_opera": (
         "spaceship", "galaxy", "planet", "alien", "warp", "starship", 
         "우주", "은하", "외계인", "함선"
-    ],
-    "western": [
+    ),
+    "western": (
         "cowboy", "revolver", "saloon", "sheriff", "outlaw", "wild west", 
         "카우보이", "서부", "총잡이"
-    ],
-    "occult": [
+    ),
+    "occult": (
         "ghost", "spirit", "curse", "exorcism", "haunted", "ritual", "demon", 
         "유령", "오컬트", "저주", "퇴마"
-    ],
-    "military": [
+    ),
+    "military": (
         "soldier", "special forces", "tactical", "warfare", "squad", "mercenary", 
         "군인", "특수부대", "용병", "전술"
-    ],
-    "noir": [
+    ),
+    "noir": (
         "detective", "noir", "crime", "shadow", "mystery", "hardboiled",
         "탐정", "느와르", "범죄", "미스터리"
-    ]
+    )
 }
 
 
+# =========================================================
+# [CONTEXT ANALYSIS] NVC 분석 수준
+# =========================================================
+class NVCLevel(IntEnum):
+    """좌뇌 분석 수준 (정수 비교/캐시 키에 사용)"""
+    MINIMAL = 0
+    FULL = 1
+
+
+NVC_LEVEL_FULL = NVCLevel.FULL
+NVC_LEVEL_MINIMAL = NVCLevel.MINIMAL
+
+# minimal 수준: 서술에 꼭 필요한 필드만 요청 (프롬프트/출력 토큰 절감)
+NVC_MINIMAL_REQUEST = (
+    "Analyze the current state from MACROSCOPIC (observable) facts only.\n"
+    "Return JSON ONLY with exactly these keys:\n"
+    "{\n"
+    '  "CurrentLocation": "Location Name",\n'
+    '  "LocationRisk": "None/Low/Medium/High/Extreme",\n'
+    '  "Observation": "Objective summary of MACROSCOPIC states only.",\n'
+    '  "Need": "Logical next step for Right Hemisphere"\n'
+    "}"
+)
+
+# minimal 분석 설정은 고정값이므로 모듈 로드 시 1회 생성해 공유 (수정하지 말 것)
+NVC_MINIMAL_CONFIG = types.GenerateContentConfig(
+    response_mime_type="application/json",
+    temperature=0.2
+)
+
+NVC_CACHE_MAX_SIZE = 256  # 동일 입력 NVC 분석 결과 캐시 크기
+
+# 입력이 완전히 동일한 NVC 분석은 API를 다시 호출하지 않고 재사용 (LRU)
+_nvc_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+nvc_cache_stats = {"hits": 0, "misses": 0}
+
+# 분석 실패 시 반환값 - 위험도를 "Low"로 단정하지 않고, 실패 표시로 후속 갱신을 건너뛰게 함
+NVC_FAILED_KEY = "_failed"
+NVC_DEFAULT_RESULT = {
+    "CurrentLocation": "Unknown",
+    "LocationRisk": "Unknown",
+    "TimeContext": "Unknown",
+    "Observation": "Analysis Failed",
+    "Need": "Proceed with Caution",
+    "SystemAction": None,
+    NVC_FAILED_KEY: True
+}
+
+
+def is_nvc_failed(nvc_result: Dict[str, Any]) -> bool:
+    """NVC 분석이 모든 재시도에 실패해 기본값을 돌려받았는지 확인합니다."""
+    return bool(nvc_result.get(NVC_FAILED_KEY))
+
+
+# 캐시 키 정규화: 유니코드 조합 형태와 공백 차이만 있는 입력은 같은 분석으로 취급
+# (문장부호·따옴표·대소문자는 질문/명령, 대사/서술을 가르므로 그대로 유지)
+_CACHE_NORMALIZE_SPACE = re.compile(r"\s+")
+
+
+def _normalize_for_cache(text: str) -> str:
+    """NFC 정규화와 공백 정리만 적용한 캐시용 문자열을 반환합니다."""
+    text = unicodedata.normalize("NFC", text)
+    return _CACHE_NORMALIZE_SPACE.sub(" ", text).strip()
+
+
+def _nvc_cache_key(model_id: str, level: NVCLevel, history_text: str, *parts: str) -> str:
+    """NVC 분석 입력 전체로 캐시 키를 만듭니다. (히스토리는 정규화 후 사용)"""
+    key_parts = (model_id, level, _normalize_for_cache(history_text)) + parts
+    return hashlib.sha256(
+        json.dumps(key_parts, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+def _nvc_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """캐시된 NVC 결과를 복사본으로 반환합니다. (없으면 None)"""
+    cached = _nvc_cache.get(key)
+    if cached is None:
+        nvc_cache_stats["misses"] += 1
+        return None
+    _nvc_cache.move_to_end(key)
+    nvc_cache_stats["hits"] += 1
+    return copy.deepcopy(cached)
+
+
+def _nvc_cache_put(key: str, result: Dict[str, Any]) -> None:
+    """성공한 NVC 결과를 캐시에 저장합니다."""
+    _nvc_cache[key] = copy.deepcopy(result)
+    _nvc_cache.move_to_end(key)
+    if len(_nvc_cache) > NVC_CACHE_MAX_SIZE:
+        _nvc_cache.popitem(last=False)
+
+
 # =========================================================
 # [HELPER] JSON 파싱 안전장치
 # =========================================================
+_JSON_START_PATTERN = re.compile(r"[{\[]")
+_CODE_FENCE_PATTERN = re.compile(r"```(json)?")
+
+
 def safe_parse_json(text: Optional[str]) -> Dict[str, Any]:
     """
     AI 응답 텍스트에서 JSON 객체나 리스트를 정밀하게 찾아 파싱합니다.
@@ -358,33 +484,25 @@ def safe_parse_json(text: Optional[str]) -> Dict[str, Any]:
     
     try:
         # 마크다운 코드 블록 제거
-        cleaned_text = re.sub(r"```(json)?", "", text).strip()
+        cleaned_text = _CODE_FENCE_PATTERN.sub("", text).strip()
         cleaned_text = cleaned_text.strip("`")
         
-        # JSON 시작점 찾기 ({ 또는 [)
-        start_idx = -1
-        for i, char in enumerate(cleaned_text):
-            if char in ['{', '[']:
-                start_idx = i
-                break
-        
-        if start_idx == -1:
+        # JSON 시작점 찾기 ({ 또는 [) - 정규식 1회 스캔
+        start_match = _JSON_START_PATTERN.search(cleaned_text)
+        if not start_match:
             return {}
+        start_idx = start_match.start()
         
-        # 대응하는 종료점 찾기
+        # 대응하는 종료점 찾기 (뒤에서부터)
         target_end = '}' if cleaned_text[start_idx] == '{' else ']'
-        end_idx = -1
-        
-        for i in range(len(cleaned_text) - 1, start_idx, -1):
-            if cleaned_text[i] == target_end:
-                end_idx = i + 1
-                break
+        end_idx = cleaned_text.rfind(target_end, start_idx + 1) + 1
         
-        if end_idx == -1:
+        if end_idx == 0:
             return {}
         
         json_str = cleaned_text[start_idx:end_idx]
-        data = json.loads(json_str)
+        # orjson.JSONDecodeError는 json.JSONDecodeError의 하위 클래스
+        data = orjson.loads(json_str) if orjson is not None else json.loads(json_str)
         
         # 리스트인 경우 첫 번째 딕셔너리 요소 반환
         if isinstance(data, list):
@@ -408,12 +526,81 @@ def safe_parse_json(text: Optional[str]) -> Dict[str, Any]:
 # =========================================================
 # [HELPER] API 호출 재시도 래퍼
 # =========================================================
+def _retry_delay(attempt: int) -> float:
+    """지수 백오프 + 지터 대기 시간을 계산합니다. (동시 재시도가 한꺼번에 몰리지 않도록)"""
+    delay = min(RETRY_DELAY_SECONDS * (2 ** attempt), MAX_RETRY_DELAY_SECONDS)
+    return delay + random.uniform(0, RETRY_JITTER_SECONDS)
+
+
+def _is_retryable_error(error: Exception) -> bool:
+    """상태 코드가 없거나(네트워크 오류 등) 일시적 오류 코드면 재시도 대상입니다."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if not isinstance(code, int):
+        return True
+    return code in RETRYABLE_STATUS_CODES
+
+
+async def _stream_text(
+    client,
+    model_id: str,
+    contents: List[types.Content],
+    config: types.GenerateContentConfig
+) -> str:
+    """스트리밍 응답의 텍스트 조각을 모아 하나의 문자열로 반환합니다."""
+    chunks = []
+    async for chunk in await client.aio.models.generate_content_stream(
+        model=model_id,
+        contents=contents,
+        config=config
+    ):
+        if chunk.text:
+            chunks.append(chunk.text)
+    return "".join(chunks)
+
+
+async def _hedged(request_factory: Callable[[], Any], hedge_delay: float) -> Optional[str]:
+    """
+    첫 요청이 hedge_delay 안에 끝나지 않으면 같은 요청을 하나 더 보내고 먼저 성공한 결과를 씁니다.
+    
+    남은 요청은 취소합니다. 둘 다 실패하면 마지막 예외를 그대로 올려 재시도 로직에 맡깁니다.
+    """
+    pending = {asyncio.create_task(request_factory())}
+    done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+    if not done:
+        pending.add(asyncio.create_task(request_factory()))
+    
+    last_error: Optional[BaseException] = None
+    try:
+        while True:
+            for task in done:
+                if task.exception() is None and task.result():
+                    return task.result()
+                last_error = task.exception() or last_error
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in pending:
+            task.cancel()
+    
+    if last_error is not None:
+        raise last_error
+    return None
+
+
+def _nvc_hedge_delay() -> Optional[float]:
+    """NVC_HEDGE=1일 때만 헤지 대기 시간을 반환합니다. (API 사용량이 늘어나므로 기본 비활성)"""
+    return NVC_HEDGE_DELAY_SECONDS if os.getenv("NVC_HEDGE") == "1" else None
+
+
 async def api_call_with_retry(
     client,
     model_id: str,
     contents: List[types.Content],
     config: types.GenerateContentConfig,
-    operation_name: str = "API Call"
+    operation_name: str = "API Call",
+    stream: bool = False,
+    hedge_delay: Optional[float] = None
 ) -> Optional[str]:
     """
     Gemini API 호출을 재시도 로직과 함께 수행합니다.
@@ -424,30 +611,47 @@ async def api_call_with_retry(
         contents: 요청 콘텐츠
         config: 생성 설정
         operation_name: 로깅용 작업 이름
+        stream: True면 스트리밍으로 받아 조각을 이어 붙임
+                (첫 바이트부터 수신하므로 대기 중 이벤트 루프가 다른 읽기를 처리)
+        hedge_delay: 지정하면 매 시도를 헤지 요청으로 수행 (꼬리 지연 단축)
     
     Returns:
         응답 텍스트 또는 None (모든 재시도 실패 시)
     """
-    for attempt in range(MAX_RETRY_COUNT):
-        try:
+    async def _request() -> Optional[str]:
+        # 대기(sleep)는 세마포어 밖에서 하므로 재시도 중에도 슬롯을 점유하지 않음
+        async with _api_semaphore:
+            if stream:
+                return await _stream_text(client, model_id, contents, config)
             response = await client.aio.models.generate_content(
                 model=model_id,
                 contents=contents,
                 config=config
             )
+            return response.text if response else None
+    
+    for attempt in range(MAX_RETRY_COUNT):
+        try:
+            if hedge_delay is not None:
+                text = await _hedged(_request, hedge_delay)
+            else:
+                text = await _request()
             
-            if response and response.text:
-                return response.text.strip()
+            if text:
+                return text.strip()
             
             logging.warning(f"[{operation_name}] 빈 응답 수신 (시도 {attempt + 1}/{MAX_RETRY_COUNT})")
             
         except Exception as e:
+            if not _is_retryable_error(e):
+                logging.error(f"[{operation_name}] 재시도 불가 오류: {e}")
+                return None
             logging.warning(
                 f"[{operation_name}] API 호출 실패 (시도 {attempt + 1}/{MAX_RETRY_COUNT}): {e}"
             )
         
         if attempt < MAX_RETRY_COUNT - 1:
-            await asyncio.sleep(RETRY_DELAY_SECONDS)
+            await asyncio.sleep(_retry_delay(attempt))
     
     logging.error(f"[{operation_name}] 모든 재시도 실패")
     return None
@@ -502,7 +706,10 @@ async def compress_lore_core(
     contents = [
         types.Content(role="user", parts=[types.Part(text=user_prompt)])
     ]
-    config = types.GenerateContentConfig(temperature=0.2)
+    config = types.GenerateContentConfig(
+        system_instruction=system_instruction,
+        temperature=0.2
+    )
     
     result = await api_call_with_retry(
         client, model_id, contents, config,
@@ -591,8 +798,9 @@ async def compress_chunk(
     """
     개별 청크를 압축합니다.
     """
+    # 청크 번호는 사용자 프롬프트로 옮겨 시스템 지시문을 모든 청크에서 동일하게 유지 (프리픽스 캐시)
     system_instruction = (
-        f"[Lore Chunk Compressor - Part {chunk_index + 1}/{total_chunks}]\n"
+        "[Lore Chunk Compressor]\n"
         "Extract ONLY essential TRPG-relevant information:\n"
         "- Character names, roles, relationships\n"
         "- Location names and characteristics\n"
@@ -603,12 +811,15 @@ async def compress_chunk(
         "Output: Bullet points, max 2000 characters."
     )
     
-    user_prompt = f"### CHUNK {chunk_index + 1}\n{chunk_text}\n\nCompress to essentials."
+    user_prompt = f"### CHUNK {chunk_index + 1}/{total_chunks}\n{chunk_text}\n\nCompress to essentials."
     
     contents = [
         types.Content(role="user", parts=[types.Part(text=user_prompt)])
     ]
-    config = types.GenerateContentConfig(temperature=0.1)
+    config = types.GenerateContentConfig(
+        system_instruction=system_instruction,
+        temperature=0.1
+    )
     
     result = await api_call_with_retry(
         client, model_id, contents, config,
@@ -660,7 +871,10 @@ async def merge_chunk_summaries(
     contents = [
         types.Content(role="user", parts=[types.Part(text=user_prompt)])
     ]
-    config = types.GenerateContentConfig(temperature=0.2)
+    config = types.GenerateContentConfig(
+        system_instruction=system_instruction,
+        temperature=0.2
+    )
     
     result = await api_call_with_retry(
         client, model_id, contents, config,
@@ -782,6 +996,194 @@ async def process_massive_lore(
 # =========================================================
 # [LOGIC ANALYZER] 상황 판단 및 인과율 계산
 # =========================================================
+# NVC 분석용 시스템 지시문 (고정 텍스트 - 모듈 로드 시 1회 생성)
+NVC_SYSTEM_INSTRUCTION = (
+    "[THEORIA LEFT HEMISPHERE - Logic Core]\n"
+    "You are the analytical component of the THEORIA system.\n"
+    "Your role: Extract OBJECTIVE FACTS from the narrative context.\n\n"
+    
+    "### CORE PRINCIPLES (From World Axiom)\n"
+    "1. **MACROSCOPIC ONLY:** Analyze observable phenomena ONLY.\n"
+    "   - ✅ Actions, speech, physical states, environmental changes\n"
+    "   - ❌ Inner thoughts, emotions, intentions (these are Microscopic)\n"
+    "2. **CAUSALITY BOUND:** Apply physics and logic strictly.\n"
+    "3. **ASYNCHRONOUS WORLD:** Consider what NPCs might be doing concurrently.\n\n"
+    
+    f"{COGNITIVE_ARCHITECTURE_MODEL}\n\n"
+    
+    f"{STATE_TRACKING_FORMAT}\n\n"
+    
+    f"{TEMPORAL_ORIENTATION_PROTOCOL}\n\n"
+    
+    "### OBSERVATION PROTOCOLS\n"
+    "1. **Physics Check (Hard Limits):** Verify physical/logical possibility. "
+    "If impossible, state: **'Action Failed: Physics Violation'**.\n"
+    "2. **Knowledge Firewall:** Distinguish Player Knowledge vs Character Knowledge.\n"
+    "3. **Causal Integrity:** Verify causes existed BEFORE effects.\n"
+    "4. **Experience Recognition:** Note significant achievements, repeated experiences, and growth moments.\n\n"
+
+    "### SYSTEM ACTION RULES (자동 퀘스트/메모/NPC 관리)\n"
+    "SystemAction triggers automatically based on narrative events.\n\n"
+    
+    "**Quest Actions:**\n"
+    "- `{\"tool\": \"Quest\", \"type\": \"Add\", \"content\": \"퀘스트 내용\"}` — When NPC gives mission, player discovers objective\n"
+    "- `{\"tool\": \"Quest\", \"type\": \"Complete\", \"content\": \"기존 퀘스트의 일부 텍스트\"}` — When objective achieved, mission accomplished\n\n"
+    
+    "**Memo Actions:**\n"
+    "- `{\"tool\": \"Memo\", \"type\": \"Add\", \"content\": \"메모 내용\"}` — Important info: clues, NPC names, codes, locations, items acquired\n"
+    "- `{\"tool\": \"Memo\", \"type\": \"Archive\", \"content\": \"기존 메모의 일부 텍스트\"}` — When memo becomes obsolete (item used, info no longer relevant)\n\n"
+    
+    "**NPC Actions:**\n"
+    "- `{\"tool\": \"NPC\", \"type\": \"Add\", \"content\": \"이름: 설명\"}` — When new named NPC introduced\n\n"
+    
+    "**Examples:**\n"
+    "- Player receives letter with mission → Quest Add\n"
+    "- Player defeats boss mentioned in quest → Quest Complete\n"
+    "- Player finds password \"1234\" → Memo Add\n"
+    "- Player uses the password successfully → Memo Archive\n"
+    "- Player meets \"철수\" the blacksmith → NPC Add\n\n"
+    
+    "**IMPORTANT:** Return `null` if no action needed. Don't force actions.\n\n"
+
+    "### NPC INTERACTION SYSTEM\n"
+    "Analyze NPCs present in the scene and their attitudes toward players.\n\n"
+    
+    "**NPCAttitudes:** For each NPC interacting with players, determine attitude based on context:\n"
+    "- `hostile`: Aggressive, threatening, may lie or attack\n"
+    "- `unfriendly`: Cold, short answers, uncooperative\n"
+    "- `neutral`: Polite, businesslike, will trade\n"
+    "- `friendly`: Warm, helpful, shares information\n"
+    "- `devoted`: Loyal, shares secrets, willing to sacrifice\n\n"
+    
+    "**NPCInteraction:** When 2+ NPCs are present, suggest ambient dialogue between them:\n"
+    "- Tavern scene: NPCs gossiping, arguing, flirting\n"
+    "- Market: Merchants competing, customers complaining\n"
+    "- Combat aftermath: NPCs reacting to events\n"
+    "- Set to `null` if no NPC interaction is appropriate.\n\n"
+
+    "### OUTPUT FORMAT (JSON ONLY)\n"
+    "{\n"
+    '  "CurrentLocation": "Location Name",\n'
+    '  "LocationRisk": "None/Low/Medium/High/Extreme",\n'
+    '  "TimeContext": "Time of day/flow",\n'
+    '  "PhysicalState": "Inferred Polyvagal state from observable behavior",\n'
+    '  "Observation": "Objective summary of MACROSCOPIC states only.",\n'
+    '  "TemporalOrientation": {\n'
+    '    "continuity_from_previous": "What carries over from last turn",\n'
+    '    "active_threads": ["Unresolved thread 1", "Thread 2"],\n'
+    '    "offscreen_npcs": ["NPC doing X elsewhere"],\n'
+    '    "suggested_focus": "What the Right Hemisphere should emphasize"\n'
+    '  },\n'
+    '  "NPCAttitudes": {\n'
+    '    "NPC이름": {"attitude": "hostile/unfriendly/neutral/friendly/devoted", "reason": "why"},\n'
+    '    "...": {...}\n'
+    '  },\n'
+    '  "NPCInteraction": {\n'
+    '    "participants": ["NPC1", "NPC2"],\n'
+    '    "type": "gossip/argument/flirt/business/reaction",\n'
+    '    "topic": "What they might discuss",\n'
+    '    "mood": "tense/casual/heated/secretive"\n'
+    '  } OR null,\n'
+    '  "AbnormalElements": ["드래곤", "마법", "고백"] OR [],\n'
+    '  "ExperienceCounters": {"독중독": 1, "백병전": 1} OR {},\n'
+    '  "Need": "Logical next step for Right Hemisphere",\n'
+    '  "SystemAction": { "tool": "Quest/Memo/NPC", "type": "Add/Complete/Archive", "content": "..." } OR null,\n'
+    '  "PlayerUpdate": {\n'
+    '    "inventory_add": {"아이템이름": 수량} OR null,\n'
+    '    "inventory_remove": {"아이템이름": 수량} OR null,\n'
+    '    "gold_change": +100 OR -50 OR null,\n'
+    '    "status_add": ["중독", "피로"] OR null,\n'
+    '    "status_remove": ["출혈"] OR null\n'
+    '  } OR null,\n'
+    '  "PlayerMemoryUpdate": {\n'
+    '    "relationships": {"NPC이름": "관계 설명"} OR null,\n'
+    '    "passives": ["새 패시브/칭호"] OR null,\n'
+    '    "known_info": ["새로 알게 된 정보"] OR null,\n'
+    '    "foreshadowing": ["복선/떡밥"] OR null,\n'
+    '    "normalization": {"비일상요소": "적응 단계"} OR null,\n'
+    '    "companions": ["동행자이름: 설명"] OR null\n'
+    '  } OR null\n'
+    "}\n"
+    "\n"
+    "### PLAYER UPDATE SYSTEM (자동 인벤토리/골드/상태이상 관리)\n"
+    "PlayerUpdate triggers automatically based on narrative events.\n\n"
+    
+    "**When to update:**\n"
+    "- Player picks up item → inventory_add\n"
+    "- Player uses/loses item → inventory_remove\n"
+    "- Player receives payment/reward → gold_change: +amount\n"
+    "- Player pays/loses money → gold_change: -amount\n"
+    "- Player gets poisoned/injured/cursed → status_add\n"
+    "- Player heals/recovers/cured → status_remove\n\n"
+    
+    "**Examples:**\n"
+    "- Player finds a sword → inventory_add: {\"검\": 1}\n"
+    "- Player drinks potion → inventory_remove: {\"포션\": 1}\n"
+    "- Player sells item for 50 gold → gold_change: 50\n"
+    "- Player gets bitten by snake → status_add: [\"중독\"]\n"
+    "- Player rests at inn → status_remove: [\"피로\"]\n\n"
+    
+    "**IMPORTANT:** Return null if no update needed. Don't force updates.\n\n"
+
+    "### ABNORMAL ELEMENTS & EXPERIENCE DETECTION\n"
+    "**AbnormalElements:** List any supernatural, unusual, or extraordinary elements in the scene.\n"
+    "Examples: 드래곤, 마법, 귀신, 상태창, 이세계, 몬스터, 초능력, 고백, 결투, 납치\n\n"
+    "**ExperienceCounters:** Detect significant experiences that contribute to character growth.\n"
+    "Use descriptive names based on what actually happened:\n"
+    "- Physical trials: 독중독, 화상, 동상, 낙하, 기절, 굶주림 등\n"
+    "- Combat experiences: 백병전, 암살시도, 포위당함 등\n"
+    "- Social/emotional: 배신당함, 거절당함, 협박당함, 죽을고비 등\n"
+    "- Supernatural: 마법피격, 드래곤조우, 귀신목격, 차원이동 등\n"
+    "Only count if it ACTUALLY HAPPENED to the player character.\n"
+    "\n"
+    "### PASSIVE SUGGESTION SYSTEM (AI-DRIVEN)\n"
+    "Analyze the player's cumulative experiences and suggest a NEW passive/title if warranted.\n\n"
+    
+    "**When to suggest a passive:**\n"
+    "- Repeated similar experiences (5+ times): 독에 자주 중독 → [독 내성]\n"
+    "- Significant relationship milestone: 엘프와 10+ 우호 상호작용 → [엘프의 친구]\n"
+    "- Survival of extreme situation: 죽을 고비 3회 → [구사일생]\n"
+    "- Unique achievement: 드래곤 처치 → [용 사냥꾼]\n"
+    "- Behavioral pattern: 항상 협상 선택 → [외교관의 혀]\n"
+    "- World-specific adaptation: 던전 50층 돌파 → [심연의 주민]\n\n"
+    
+    "**Passive structure:**\n"
+    "- name: Creative Korean title (e.g., '엘프의 친구', '불굴의 정신')\n"
+    "- trigger: What earned this (e.g., '엘프와 우호적 상호작용 10회')\n"
+    "- effect: Concrete in-world effect (e.g., '엘프에게 호감도 보너스, 엘프어 기초 이해')\n"
+    "- category: 생존/전투/사회/초자연/지식/기타\n\n"
+    
+    "**Rules:**\n"
+    "- Only suggest if TRULY earned through gameplay, not arbitrary\n"
+    "- Be creative but grounded in what actually happened\n"
+    "- Don't repeat passives player already has (check context)\n"
+    "- Suggest at most 1 passive per analysis\n"
+    "- Set to null if no passive is warranted\n\n"
+    
+    '  "PassiveSuggestion": {\n'
+    '    "name": "패시브/칭호 이름",\n'
+    '    "trigger": "획득 조건 설명",\n'
+    '    "effect": "구체적 효과",\n'
+    '    "category": "카테고리",\n'
+    '    "reasoning": "왜 이 패시브를 제안하는지 간단 설명"\n'
+    '  } OR null,\n'
+)
+
+@functools.lru_cache(maxsize=32)
+def _get_nvc_config(rules: str) -> types.GenerateContentConfig:
+    """
+    고정 지시문 + 룰을 시스템 지시문으로 한 NVC 분석 설정을 반환합니다. (턴 간 공유, 수정하지 말 것)
+    
+    룰은 채널마다 거의 바뀌지 않으므로 매 턴 동일한 접두부가 되어
+    서버 측 프롬프트 캐시에 적중할 수 있고, 설정 객체도 매 턴 새로 검증하지 않습니다.
+    """
+    return types.GenerateContentConfig(
+        system_instruction=f"{NVC_SYSTEM_INSTRUCTION}\n\n### [RULES]\n{rules}",
+        response_mime_type="application/json",
+        temperature=0.2  # 약간의 창의성 허용
+    )
+
+
 async def analyze_context_nvc(
     client,
     model_id: str,
@@ -789,7 +1191,8 @@ async def analyze_context_nvc(
     lore: str,
     rules: str,
     active_quests_text: str,
-    player_context: str = ""
+    player_context: str = "",
+    level: NVCLevel = NVC_LEVEL_FULL
 ) -> Dict[str, Any]:
     """
     [THEORIA LEFT HEMISPHERE]
@@ -803,189 +1206,49 @@ async def analyze_context_nvc(
         rules: 게임 규칙
         active_quests_text: 활성 퀘스트 목록
         player_context: 플레이어 상태 (보유 패시브 등)
+        level: 분석 수준 (NVCLevel.FULL 또는 NVCLevel.MINIMAL)
+               minimal은 위치/위험도/관찰/다음 단계만 요청합니다.
     
     Returns:
         분석 결과 딕셔너리
     """
-    system_instruction = (
-        "[THEORIA LEFT HEMISPHERE - Logic Core]\n"
-        "You are the analytical component of the THEORIA system.\n"
-        "Your role: Extract OBJECTIVE FACTS from the narrative context.\n\n"
-        
-        "### CORE PRINCIPLES (From World Axiom)\n"
-        "1. **MACROSCOPIC ONLY:** Analyze observable phenomena ONLY.\n"
-        "   - ✅ Actions, speech, physical states, environmental changes\n"
-        "   - ❌ Inner thoughts, emotions, intentions (these are Microscopic)\n"
-        "2. **CAUSALITY BOUND:** Apply physics and logic strictly.\n"
-        "3. **ASYNCHRONOUS WORLD:** Consider what NPCs might be doing concurrently.\n\n"
-        
-        f"{COGNITIVE_ARCHITECTURE_MODEL}\n\n"
-        
-        f"{STATE_TRACKING_FORMAT}\n\n"
-        
-        f"{TEMPORAL_ORIENTATION_PROTOCOL}\n\n"
-        
-        "### OBSERVATION PROTOCOLS\n"
-        "1. **Physics Check (Hard Limits):** Verify physical/logical possibility. "
-        "If impossible, state: **'Action Failed: Physics Violation'**.\n"
-        "2. **Knowledge Firewall:** Distinguish Player Knowledge vs Character Knowledge.\n"
-        "3. **Causal Integrity:** Verify causes existed BEFORE effects.\n"
-        "4. **Experience Recognition:** Note significant achievements, repeated experiences, and growth moments.\n\n"
-
-        "### SYSTEM ACTION RULES (자동 퀘스트/메모/NPC 관리)\n"
-        "SystemAction triggers automatically based on narrative events.\n\n"
-        
-        "**Quest Actions:**\n"
-        "- `{\"tool\": \"Quest\", \"type\": \"Add\", \"content\": \"퀘스트 내용\"}` — When NPC gives mission, player discovers objective\n"
-        "- `{\"tool\": \"Quest\", \"type\": \"Complete\", \"content\": \"기존 퀘스트의 일부 텍스트\"}` — When objective achieved, mission accomplished\n\n"
-        
-        "**Memo Actions:**\n"
-        "- `{\"tool\": \"Memo\", \"type\": \"Add\", \"content\": \"메모 내용\"}` — Important info: clues, NPC names, codes, locations, items acquired\n"
-        "- `{\"tool\": \"Memo\", \"type\": \"Archive\", \"content\": \"기존 메모의 일부 텍스트\"}` — When memo becomes obsolete (item used, info no longer relevant)\n\n"
-        
-        "**NPC Actions:**\n"
-        "- `{\"tool\": \"NPC\", \"type\": \"Add\", \"content\": \"이름: 설명\"}` — When new named NPC introduced\n\n"
-        
-        "**Examples:**\n"
-        "- Player receives letter with mission → Quest Add\n"
-        "- Player defeats boss mentioned in quest → Quest Complete\n"
-        "- Player finds password \"1234\" → Memo Add\n"
-        "- Player uses the password successfully → Memo Archive\n"
-        "- Player meets \"철수\" the blacksmith → NPC Add\n\n"
-        
-        "**IMPORTANT:** Return `null` if no action needed. Don't force actions.\n\n"
-
-        "### NPC INTERACTION SYSTEM\n"
-        "Analyze NPCs present in the scene and their attitudes toward players.\n\n"
-        
-        "**NPCAttitudes:** For each NPC interacting with players, determine attitude based on context:\n"
-        "- `hostile`: Aggressive, threatening, may lie or attack\n"
-        "- `unfriendly`: Cold, short answers, uncooperative\n"
-        "- `neutral`: Polite, businesslike, will trade\n"
-        "- `friendly`: Warm, helpful, shares information\n"
-        "- `devoted`: Loyal, shares secrets, willing to sacrifice\n\n"
-        
-        "**NPCInteraction:** When 2+ NPCs are present, suggest ambient dialogue between them:\n"
-        "- Tavern scene: NPCs gossiping, arguing, flirting\n"
-        "- Market: Merchants competing, customers complaining\n"
-        "- Combat aftermath: NPCs reacting to events\n"
-        "- Set to `null` if no NPC interaction is appropriate.\n\n"
-
-        "### OUTPUT FORMAT (JSON ONLY)\n"
-        "{\n"
-        '  "CurrentLocation": "Location Name",\n'
-        '  "LocationRisk": "None/Low/Medium/High/Extreme",\n'
-        '  "TimeContext": "Time of day/flow",\n'
-        '  "PhysicalState": "Inferred Polyvagal state from observable behavior",\n'
-        '  "Observation": "Objective summary of MACROSCOPIC states only.",\n'
-        '  "TemporalOrientation": {\n'
-        '    "continuity_from_previous": "What carries over from last turn",\n'
-        '    "active_threads": ["Unresolved thread 1", "Thread 2"],\n'
-        '    "offscreen_npcs": ["NPC doing X elsewhere"],\n'
-        '    "suggested_focus": "What the Right Hemisphere should emphasize"\n'
-        '  },\n'
-        '  "NPCAttitudes": {\n'
-        '    "NPC이름": {"attitude": "hostile/unfriendly/neutral/friendly/devoted", "reason": "why"},\n'
-        '    "...": {...}\n'
-        '  },\n'
-        '  "NPCInteraction": {\n'
-        '    "participants": ["NPC1", "NPC2"],\n'
-        '    "type": "gossip/argument/flirt/business/reaction",\n'
-        '    "topic": "What they might discuss",\n'
-        '    "mood": "tense/casual/heated/secretive"\n'
-        '  } OR null,\n'
-        '  "AbnormalElements": ["드래곤", "마법", "고백"] OR [],\n'
-        '  "ExperienceCounters": {"독중독": 1, "백병전": 1} OR {},\n'
-        '  "Need": "Logical next step for Right Hemisphere",\n'
-        '  "SystemAction": { "tool": "Quest/Memo/NPC", "type": "Add/Complete/Archive", "content": "..." } OR null,\n'
-        '  "PlayerUpdate": {\n'
-        '    "inventory_add": {"아이템이름": 수량} OR null,\n'
-        '    "inventory_remove": {"아이템이름": 수량} OR null,\n'
-        '    "gold_change": +100 OR -50 OR null,\n'
-        '    "status_add": ["중독", "피로"] OR null,\n'
-        '    "status_remove": ["출혈"] OR null\n'
-        '  } OR null,\n'
-        '  "PlayerMemoryUpdate": {\n'
-        '    "relationships": {"NPC이름": "관계 설명"} OR null,\n'
-        '    "passives": ["새 패시브/칭호"] OR null,\n'
-        '    "known_info": ["새로 알게 된 정보"] OR null,\n'
-        '    "foreshadowing": ["복선/떡밥"] OR null,\n'
-        '    "normalization": {"비일상요소": "적응 단계"} OR null,\n'
-        '    "companions": ["동행자이름: 설명"] OR null\n'
-        '  } OR null\n'
-        "}\n"
-        "\n"
-        "### PLAYER UPDATE SYSTEM (자동 인벤토리/골드/상태이상 관리)\n"
-        "PlayerUpdate triggers automatically based on narrative events.\n\n"
-        
-        "**When to update:**\n"
-        "- Player picks up item → inventory_add\n"
-        "- Player uses/loses item → inventory_remove\n"
-        "- Player receives payment/reward → gold_change: +amount\n"
-        "- Player pays/loses money → gold_change: -amount\n"
-        "- Player gets poisoned/injured/cursed → status_add\n"
-        "- Player heals/recovers/cured → status_remove\n\n"
-        
-        "**Examples:**\n"
-        "- Player finds a sword → inventory_add: {\"검\": 1}\n"
-        "- Player drinks potion → inventory_remove: {\"포션\": 1}\n"
-        "- Player sells item for 50 gold → gold_change: 50\n"
-        "- Player gets bitten by snake → status_add: [\"중독\"]\n"
-        "- Player rests at inn → status_remove: [\"피로\"]\n\n"
-        
-        "**IMPORTANT:** Return null if no update needed. Don't force updates.\n\n"
-
-        "### ABNORMAL ELEMENTS & EXPERIENCE DETECTION\n"
-        "**AbnormalElements:** List any supernatural, unusual, or extraordinary elements in the scene.\n"
-        "Examples: 드래곤, 마법, 귀신, 상태창, 이세계, 몬스터, 초능력, 고백, 결투, 납치\n\n"
-        "**ExperienceCounters:** Detect significant experiences that contribute to character growth.\n"
-        "Use descriptive names based on what actually happened:\n"
-        "- Physical trials: 독중독, 화상, 동상, 낙하, 기절, 굶주림 등\n"
-        "- Combat experiences: 백병전, 암살시도, 포위당함 등\n"
-        "- Social/emotional: 배신당함, 거절당함, 협박당함, 죽을고비 등\n"
-        "- Supernatural: 마법피격, 드래곤조우, 귀신목격, 차원이동 등\n"
-        "Only count if it ACTUALLY HAPPENED to the player character.\n"
-        "\n"
-        "### PASSIVE SUGGESTION SYSTEM (AI-DRIVEN)\n"
-        "Analyze the player's cumulative experiences and suggest a NEW passive/title if warranted.\n\n"
-        
-        "**When to suggest a passive:**\n"
-        "- Repeated similar experiences (5+ times): 독에 자주 중독 → [독 내성]\n"
-        "- Significant relationship milestone: 엘프와 10+ 우호 상호작용 → [엘프의 친구]\n"
-        "- Survival of extreme situation: 죽을 고비 3회 → [구사일생]\n"
-        "- Unique achievement: 드래곤 처치 → [용 사냥꾼]\n"
-        "- Behavioral pattern: 항상 협상 선택 → [외교관의 혀]\n"
-        "- World-specific adaptation: 던전 50층 돌파 → [심연의 주민]\n\n"
-        
-        "**Passive structure:**\n"
-        "- name: Creative Korean title (e.g., '엘프의 친구', '불굴의 정신')\n"
-        "- trigger: What earned this (e.g., '엘프와 우호적 상호작용 10회')\n"
-        "- effect: Concrete in-world effect (e.g., '엘프에게 호감도 보너스, 엘프어 기초 이해')\n"
-        "- category: 생존/전투/사회/초자연/지식/기타\n\n"
-        
-        "**Rules:**\n"
-        "- Only suggest if TRULY earned through gameplay, not arbitrary\n"
-        "- Be creative but grounded in what actually happened\n"
-        "- Don't repeat passives player already has (check context)\n"
-        "- Suggest at most 1 passive per analysis\n"
-        "- Set to null if no passive is warranted\n\n"
-        
-        '  "PassiveSuggestion": {\n'
-        '    "name": "패시브/칭호 이름",\n'
-        '    "trigger": "획득 조건 설명",\n'
-        '    "effect": "구체적 효과",\n'
-        '    "category": "카테고리",\n'
-        '    "reasoning": "왜 이 패시브를 제안하는지 간단 설명"\n'
-        '  } OR null,\n'
+    cache_key = _nvc_cache_key(
+        model_id, level, history_text, lore, rules, active_quests_text, player_context
     )
-
+    cached = _nvc_cache_get(cache_key)
+    if cached is not None:
+        logging.info(
+            f"[NVC Cache] 적중 (hits={nvc_cache_stats['hits']}, misses={nvc_cache_stats['misses']})"
+        )
+        return cached
+    
+    if level == NVC_LEVEL_MINIMAL:
+        user_prompt = (
+            f"### [HISTORY]\n{history_text}\n"
+            f"{NVC_MINIMAL_REQUEST}"
+        )
+        contents = [
+            types.Content(role="user", parts=[types.Part(text=user_prompt)])
+        ]
+        result = await api_call_with_retry(
+            client, model_id, contents, NVC_MINIMAL_CONFIG,
+            operation_name="Context Analysis (NVC/minimal)",
+            stream=True,
+            hedge_delay=_nvc_hedge_delay()
+        )
+        parsed = safe_parse_json(result) if result else {}
+        if parsed:
+            _nvc_cache_put(cache_key, parsed)
+            return parsed
+        return dict(NVC_DEFAULT_RESULT)
+    
     # player_context가 있으면 추가 (중복 패시브 방지용)
     player_info = ""
     if player_context:
         player_info = f"### [PLAYER STATUS]\n{player_context}\n"
 
+    # 룰은 시스템 지시문(고정 접두부)으로, 변하는 값만 user 메시지로 전달
     user_prompt = (
-        f"### [RULES]\n{rules}\n"
         f"### [QUESTS]\n{active_quests_text}\n"
         f"{player_info}"
         f"### [HISTORY]\n{history_text}\n"
@@ -997,46 +1260,137 @@ async def analyze_context_nvc(
         types.Content(role="user", parts=[types.Part(text=user_prompt)])
     ]
     
-    config = types.GenerateContentConfig(
-        response_mime_type="application/json",
-        temperature=0.2  # 약간의 창의성 허용
-    )
-    
     result = await api_call_with_retry(
-        client, model_id, contents, config,
-        operation_name="Context Analysis (NVC)"
+        client, model_id, contents, _get_nvc_config(rules),
+        operation_name="Context Analysis (NVC)",
+        stream=True,
+        hedge_delay=_nvc_hedge_delay()
     )
     
     if result:
         parsed = safe_parse_json(result)
         if parsed:
+            _nvc_cache_put(cache_key, parsed)
             return parsed
     
     # 기본값 반환
-    return {
-        "CurrentLocation": "Unknown",
-        "LocationRisk": "Low",
-        "TimeContext": "Unknown",
-        "Observation": "Analysis Failed",
-        "Need": "Proceed with Caution",
-        "SystemAction": None
-    }
+    return dict(NVC_DEFAULT_RESULT)
+
+
+# =========================================================
+# [LORE CACHE] 로어 분석 결과 캐시
+# =========================================================
+LORE_CACHE_MAX_SIZE = 64  # 로어 분석 결과 캐시 크기
+
+# 로어 분석은 로어 텍스트만의 함수이므로 같은 로어를 다시 분석하면 재사용 (LRU)
+_lore_cache: "OrderedDict[str, Any]" = OrderedDict()
+
+# 같은 로어에 대한 분석이 동시에 들어오면 진행 중인 하나의 작업을 함께 기다림
+_lore_inflight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+
+
+def _lore_cache_key(model_id: str, lore_text: str) -> str:
+    """모델 + 로어 본문 해시로 캐시 키를 만듭니다."""
+    digest = hashlib.blake2b(lore_text.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{model_id}:{digest}"
+
+
+def _lore_cache_get(key: str) -> Optional[Any]:
+    """캐시된 로어 분석 결과를 복사본으로 반환합니다. (없으면 None)"""
+    cached = _lore_cache.get(key)
+    if cached is None:
+        return None
+    _lore_cache.move_to_end(key)
+    return copy.deepcopy(cached)
+
+
+def _lore_cache_put(key: str, result: Any) -> None:
+    """API 분석에 성공한 로어 결과를 캐시에 저장합니다."""
+    _lore_cache[key] = copy.deepcopy(result)
+    _lore_cache.move_to_end(key)
+    if len(_lore_cache) > LORE_CACHE_MAX_SIZE:
+        _lore_cache.popitem(last=False)
 
 
 # =========================================================
 # [GENRE ANALYZER] 장르 분석 (AI + 키워드 폴백)
 # =========================================================
+def _build_genre_keyword_automaton():
+    """모든 장르 키워드를 한 번의 선형 스캔으로 찾는 Aho–Corasick 오토마톤을 만듭니다."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keywords in GENRE_KEYWORD_MAP.values():
+        for keyword in keywords:
+            automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+_GENRE_KEYWORD_AUTOMATON = _build_genre_keyword_automaton()
+
+
+def _build_genre_keyword_owners() -> Dict[str, Tuple[str, ...]]:
+    """키워드 → 그 키워드를 가진 장르들 (찾은 키워드만 보고 점수를 매기기 위함)"""
+    owners: Dict[str, Tuple[str, ...]] = {}
+    for genre, keywords in GENRE_KEYWORD_MAP.items():
+        for keyword in keywords:
+            owners[keyword] = owners.get(keyword, ()) + (genre,)
+    return owners
+
+
+_GENRE_KEYWORD_OWNERS = _build_genre_keyword_owners()
+
+# 모든 장르 키워드 (정규식 폴백용)
+_ALL_GENRE_KEYWORDS = frozenset(_GENRE_KEYWORD_OWNERS)
+
+
+def _build_genre_keyword_pattern():
+    """
+    오토마톤을 못 쓸 때 모든 장르 키워드를 하나의 교대 정규식으로 묶습니다.
+    
+    전방탐색 안에서 캡처하므로 겹치는 매칭까지 한 번의 스캔으로 찾습니다. 긴 키워드를 먼저 두어
+    같은 위치에서는 가장 긴 키워드가 잡히고, 그때 가려지는 접두어 키워드는
+    _GENRE_KEYWORD_PREFIXES로 보충합니다.
+    """
+    if _GENRE_KEYWORD_AUTOMATON is not None:
+        return None
+    keywords = sorted(_ALL_GENRE_KEYWORDS, key=len, reverse=True)
+    return re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in keywords) + "))")
+
+
+_GENRE_KEYWORD_PATTERN = _build_genre_keyword_pattern()
+
+# 키워드별로 그 키워드의 접두어인 다른 키워드 (예: "cultivation" → "cult")
+_GENRE_KEYWORD_PREFIXES = {
+    keyword: tuple(
+        other for other in _ALL_GENRE_KEYWORDS
+        if other != keyword and keyword.startswith(other)
+    )
+    for keyword in _ALL_GENRE_KEYWORDS
+}
+
+
 def _calculate_keyword_scores(text: str) -> Dict[str, int]:
-    """텍스트에서 장르별 키워드 점수를 계산합니다."""
+    """텍스트에서 장르별 키워드 점수를 계산합니다. (장르별로 등장한 서로 다른 키워드 수)"""
     text_lower = text.lower()
-    scores = {}
     
-    for genre, keywords in GENRE_KEYWORD_MAP.items():
-        count = sum(1 for keyword in keywords if keyword in text_lower)
-        if count > 0:
-            scores[genre] = count
+    if _GENRE_KEYWORD_AUTOMATON is not None:
+        # 로어 전체를 한 번만 훑어 등장한 키워드 집합을 구함 (겹치는 매칭 포함)
+        found = {keyword for _, keyword in _GENRE_KEYWORD_AUTOMATON.iter(text_lower)}
+    else:
+        # 단일 정규식으로 한 번 훑고, 같은 위치에서 가려진 접두어 키워드를 더함
+        found = set(_GENRE_KEYWORD_PATTERN.findall(text_lower))
+        for keyword in tuple(found):
+            found.update(_GENRE_KEYWORD_PREFIXES[keyword])
     
-    return scores
+    # 찾은 키워드만 순회해 점수를 쌓고, 동점 정렬이 바뀌지 않도록 GENRE_KEYWORD_MAP 순서로 반환
+    counts: Dict[str, int] = {}
+    for keyword in found:
+        for genre in _GENRE_KEYWORD_OWNERS[keyword]:
+            counts[genre] = counts.get(genre, 0) + 1
+    
+    return {genre: counts[genre] for genre in GENRE_KEYWORD_MAP if genre in counts}
 
 
 def _select_top_genres(
@@ -1094,6 +1448,9 @@ async def analyze_genre_from_lore(
     [Logic Core] 로어에서 장르와 톤을 분석합니다.
     AI 분석을 우선하고, 실패 시 키워드 스코어링으로 폴백합니다.
     
+    analyze_lore_bundle 결과에서 장르/톤만 꺼내므로, 같은 로어의 NPC/위치 분석과
+    API 호출 한 번(및 캐시)을 공유합니다.
+    
     Args:
         client: Gemini 클라이언트
         model_id: 모델 ID
@@ -1102,63 +1459,16 @@ async def analyze_genre_from_lore(
     Returns:
         {"genres": [...], "custom_tone": "..."}
     """
-    ai_genres = []
-    custom_tone = "Default"
-    ai_confidence = "low"
-    
-    # 1. AI 분석 시도
-    system_instruction = (
-        "Analyze the provided Lore and extract Key Genres.\n"
-        "**CRITICAL RULES:**\n"
-        "1. Select ONLY the most dominant 1-3 genres. Do not list minor elements.\n"
-        "2. Prioritize genres that define the core atmosphere and narrative structure.\n"
-        "3. If multiple genres compete, choose those most explicitly mentioned or thematically central.\n\n"
-        f"Supported List: {SUPPORTED_GENRES}\n\n"
-        'Output JSON: {"genres": [str], "custom_tone": str, "confidence": "high/medium/low"}'
-    )
-    
-    user_prompt = f"Lore Data:\n{lore_text}"
-    
-    contents = [
-        types.Content(role="user", parts=[types.Part(text=user_prompt)])
-    ]
-    config = types.GenerateContentConfig(
-        system_instruction=system_instruction,
-        response_mime_type="application/json",
-        temperature=0.3
-    )
-    
-    for attempt in range(MAX_RETRY_COUNT):
-        try:
-            response = await client.aio.models.generate_content(
-                model=model_id,
-                contents=contents,
-                config=config
-            )
-            
-            if response and response.text:
-                data = safe_parse_json(response.text)
-                ai_genres = data.get("genres", [])
-                custom_tone = data.get("custom_tone", "Analyzed Tone")
-                ai_confidence = data.get("confidence", "medium")
-                
-                # AI가 명확히 판단했으면 (1-3개 장르 + 높은 신뢰도)
-                if ai_genres and len(ai_genres) <= 3 and ai_confidence in ["high", "medium"]:
-                    logging.info(
-                        f"[Genre Analysis] AI 분석 성공: {ai_genres} (신뢰도: {ai_confidence})"
-                    )
-                    return {
-                        "genres": ai_genres[:3],
-                        "custom_tone": custom_tone
-                    }
-            break
-            
-        except Exception as e:
-            logging.warning(f"[Genre Analysis] AI 시도 {attempt + 1}/{MAX_RETRY_COUNT} 실패: {e}")
-            if attempt < MAX_RETRY_COUNT - 1:
-                await asyncio.sleep(RETRY_DELAY_SECONDS)
-    
-    # 2. 키워드 폴백 시스템
+    bundle = await analyze_lore_bundle(client, model_id, lore_text)
+    return {"genres": bundle["genres"], "custom_tone": bundle["custom_tone"]}
+
+
+def _genres_with_keyword_fallback(
+    lore_text: str,
+    ai_genres: List[str],
+    custom_tone: str
+) -> Dict[str, Any]:
+    """AI 장르 판단이 불확실할 때 키워드 스코어링으로 최종 장르를 결정합니다."""
     logging.info("[Genre Analysis] AI 신뢰도 낮음 → 키워드 스코어링 시작")
     
     keyword_scores = _calculate_keyword_scores(lore_text)
@@ -1187,6 +1497,7 @@ async def analyze_npcs_from_lore(
 ) -> List[Dict[str, str]]:
     """
     [Logic Core] 로어에서 주요 NPC 정보를 추출합니다.
+    (analyze_lore_bundle 결과의 NPC 부분)
     
     Args:
         client: Gemini 클라이언트
@@ -1196,40 +1507,15 @@ async def analyze_npcs_from_lore(
     Returns:
         NPC 정보 리스트 [{"name": "...", "description": "..."}, ...]
     """
-    system_instruction = (
-        "Extract major NPCs from the lore.\n"
-        "Focus on characters with significant roles, unique traits, or plot importance.\n"
-        'Output JSON: {"npcs": [{"name": "...", "description": "..."}]}'
-    )
-    
-    user_prompt = f"Lore Data:\n{lore_text}"
-    
-    contents = [
-        types.Content(role="user", parts=[types.Part(text=user_prompt)])
-    ]
-    config = types.GenerateContentConfig(
-        response_mime_type="application/json",
-        temperature=0.3
-    )
-    
-    result = await api_call_with_retry(
-        client, model_id, contents, config,
-        operation_name="NPC Analysis"
-    )
-    
-    if result:
-        data = safe_parse_json(result)
-        npcs = data.get("npcs", [])
-        
-        if isinstance(npcs, list):
-            # 유효한 NPC만 필터링
-            valid_npcs = [
-                npc for npc in npcs
-                if isinstance(npc, dict) and npc.get("name")
-            ]
-            return valid_npcs
-    
-    return []
+    bundle = await analyze_lore_bundle(client, model_id, lore_text)
+    return bundle["npcs"]
+
+
+def _valid_npcs(npcs: Any) -> List[Dict[str, str]]:
+    """이름이 있는 NPC 항목만 남깁니다."""
+    if not isinstance(npcs, list):
+        return []
+    return [npc for npc in npcs if isinstance(npc, dict) and npc.get("name")]
 
 
 # =========================================================
@@ -1242,6 +1528,7 @@ async def analyze_location_rules_from_lore(
 ) -> Dict[str, Dict[str, str]]:
     """
     [Logic Core] 로어에서 위치별 환경 규칙을 추출합니다.
+    (analyze_lore_bundle 결과의 위치 규칙 부분)
     
     Args:
         client: Gemini 클라이언트
@@ -1252,36 +1539,118 @@ async def analyze_location_rules_from_lore(
         위치별 규칙 딕셔너리
         {"LocationName": {"risk": "High", "condition": "Night", "effect": "..."}}
     """
+    bundle = await analyze_lore_bundle(client, model_id, lore_text)
+    return bundle["rules"]
+
+
+# =========================================================
+# [LORE BUNDLE] 장르/NPC/위치 규칙 통합 분석
+# =========================================================
+async def analyze_lore_bundle(
+    client,
+    model_id: str,
+    lore_text: str
+) -> Dict[str, Any]:
+    """
+    [Logic Core] 장르/톤, 주요 NPC, 위치별 규칙을 한 번의 호출로 추출합니다.
+    
+    analyze_genre_from_lore / analyze_npcs_from_lore / analyze_location_rules_from_lore는
+    모두 이 함수의 결과를 나눠 반환하므로, 같은 로어에 대해 API 호출은 한 번뿐입니다.
+    장르 판단이 불확실하면 기존과 같이 키워드 스코어링으로 폴백합니다.
+    
+    Args:
+        client: Gemini 클라이언트
+        model_id: 모델 ID
+        lore_text: 로어 텍스트
+    
+    Returns:
+        {"genres": [...], "custom_tone": "...", "npcs": [...], "rules": {...}}
+    """
+    cache_key = _lore_cache_key(model_id, lore_text)
+    cached = _lore_cache_get(cache_key)
+    if cached is not None:
+        logging.info("[Lore Bundle Analysis] 동일 로어 - 캐시된 분석 결과 사용")
+        return cached
+    
+    task = _lore_inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_run_lore_bundle(client, model_id, lore_text, cache_key))
+        _lore_inflight[cache_key] = task
+        task.add_done_callback(lambda _: _lore_inflight.pop(cache_key, None))
+    else:
+        logging.info("[Lore Bundle Analysis] 동일 로어 분석 진행 중 - 결과 공유")
+    
+    # 한 호출자가 취소되어도 공유 작업은 계속되도록 shield, 결과는 호출자별 복사본
+    return copy.deepcopy(await asyncio.shield(task))
+
+
+async def _run_lore_bundle(
+    client,
+    model_id: str,
+    lore_text: str,
+    cache_key: str
+) -> Dict[str, Any]:
+    """analyze_lore_bundle의 실제 API 호출 및 결과 정리 (캐시 미스 시 1회만 실행)"""
     system_instruction = (
-        "Extract location-specific rules and environmental hazards from the lore.\n"
-        "Focus on dangerous areas, special conditions, and their effects.\n"
-        'Output JSON: {"rules": {"LocationName": {"risk": "High/Medium/Low", '
-        '"condition": "Night/Always/Special", "effect": "description"}}}'
+        "Analyze the provided Lore and extract three things in ONE JSON object.\n\n"
+        "### 1. Genres\n"
+        "1. Select ONLY the most dominant 1-3 genres. Do not list minor elements.\n"
+        "2. Prioritize genres that define the core atmosphere and narrative structure.\n"
+        "3. If multiple genres compete, choose those most explicitly mentioned or thematically central.\n"
+        f"Supported List: {SUPPORTED_GENRES}\n\n"
+        "### 2. NPCs\n"
+        "Extract major NPCs: characters with significant roles, unique traits, or plot importance.\n\n"
+        "### 3. Location Rules\n"
+        "Extract location-specific rules and environmental hazards: "
+        "dangerous areas, special conditions, and their effects.\n\n"
+        "Output JSON: {\n"
+        '  "genres": [str], "custom_tone": str, "confidence": "high/medium/low",\n'
+        '  "npcs": [{"name": "...", "description": "..."}],\n'
+        '  "rules": {"LocationName": {"risk": "High/Medium/Low", '
+        '"condition": "Night/Always/Special", "effect": "description"}}\n'
+        "}"
     )
     
-    user_prompt = f"Lore Data:\n{lore_text}"
-    
     contents = [
-        types.Content(role="user", parts=[types.Part(text=user_prompt)])
+        types.Content(role="user", parts=[types.Part(text=f"Lore Data:\n{lore_text}")])
     ]
     config = types.GenerateContentConfig(
+        system_instruction=system_instruction,
         response_mime_type="application/json",
         temperature=0.3
     )
     
     result = await api_call_with_retry(
         client, model_id, contents, config,
-        operation_name="Location Rules Analysis"
+        operation_name="Lore Bundle Analysis"
     )
+    data = safe_parse_json(result) if result else {}
+    
+    ai_genres = data.get("genres", [])
+    if not isinstance(ai_genres, list):
+        ai_genres = []
+    custom_tone = data.get("custom_tone") or ("Analyzed Tone" if data else "Default")
+    ai_confidence = data.get("confidence", "medium" if data else "low")
+    
+    if ai_genres and len(ai_genres) <= 3 and ai_confidence in ["high", "medium"]:
+        logging.info(f"[Genre Analysis] AI 분석 성공: {ai_genres} (신뢰도: {ai_confidence})")
+        genre_res = {"genres": ai_genres[:3], "custom_tone": custom_tone}
+    else:
+        genre_res = _genres_with_keyword_fallback(lore_text, ai_genres, custom_tone)
+    
+    rules = data.get("rules", {})
+    
+    bundle = {
+        "genres": genre_res["genres"],
+        "custom_tone": genre_res["custom_tone"],
+        "npcs": _valid_npcs(data.get("npcs", [])),
+        "rules": rules if isinstance(rules, dict) else {}
+    }
     
-    if result:
-        data = safe_parse_json(result)
-        rules = data.get("rules", {})
-        
-        if isinstance(rules, dict):
-            return rules
-    
-    return {}
+    # API 응답을 받은 경우에만 캐시 (실패 시 폴백 결과가 굳지 않도록)
+    if data:
+        _lore_cache_put(cache_key, bundle)
+    return bundle
 
 
 # =========================================================
@@ -1369,6 +1738,7 @@ async def analyze_brainstorming(
         types.Content(role="user", parts=[types.Part(text=user_prompt)])
     ]
     config = types.GenerateContentConfig(
+        system_instruction=system_instruction,
         response_mime_type="application/json",
         temperature=0.5  # 창의적 분석을 위해 약간 높은 온도
     )
@@ -1443,6 +1813,7 @@ async def check_narrative_consistency(
         types.Content(role="user", parts=[types.Part(text=user_prompt)])
     ]
     config = types.GenerateContentConfig(
+        system_instruction=system_instruction,
         response_mime_type="application/json",
         temperature=0.1
     )
@@ -1493,6 +1864,7 @@ async def extract_world_constraints(
         types.Content(role="user", parts=[types.Part(text=user_prompt)])
     ]
     config = types.GenerateContentConfig(
+        system_instruction=system_instruction,
         response_mime_type="application/json",
         temperature=0.2
     )
@@ -1514,6 +1886,16 @@ async def extract_world_constraints(
 # OOC 명령 처리 및 AI 메모리 갱신
 # =========================================================
 
+OOC_COMMAND_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'\(OOC[:\s]+(.+?)\)',      # (OOC: 내용)
+    r'\[OOC[:\s]+(.+?)\]',      # [OOC: 내용]
+    r'\(\((.+?)\)\)',            # ((내용))
+    r'^OOC[:\s]+(.+)$',          # OOC: 내용 (줄 시작)
+    r'\(메타[:\s]+(.+?)\)',      # (메타: 내용)
+    r'\(시스템[:\s]+(.+?)\)',    # (시스템: 내용)
+))
+
+
 def detect_ooc_command(text: str) -> Optional[Dict[str, str]]:
     """
     텍스트에서 OOC 명령을 감지합니다.
@@ -1527,19 +1909,8 @@ def detect_ooc_command(text: str) -> Optional[Dict[str, str]]:
     Returns:
         {"type": "ooc", "content": "명령 내용"} 또는 None
     """
-    import re
-    
-    patterns = [
-        r'\(OOC[:\s]+(.+?)\)',      # (OOC: 내용)
-        r'\[OOC[:\s]+(.+?)\]',      # [OOC: 내용]
-        r'\(\((.+?)\)\)',            # ((내용))
-        r'^OOC[:\s]+(.+)$',          # OOC: 내용 (줄 시작)
-        r'\(메타[:\s]+(.+?)\)',      # (메타: 내용)
-        r'\(시스템[:\s]+(.+?)\)',    # (시스템: 내용)
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in OOC_COMMAND_PATTERNS:
+        match = pattern.search(text)
         if match:
             return {"type": "ooc", "content": match.group(1).strip()}
     
@@ -24,17 +24,31 @@ Prompt Order (SillyTavern Preset Style):
 """
 
 import asyncio
+import functools
 import logging
+import random
 import re
-from typing import Optional, List, Dict, Any, Tuple
-from google import genai
+import unicodedata
+from collections import deque
+from types import MappingProxyType
+from typing import Optional, List, Dict, Any, Mapping, Tuple
 from google.genai import types
 
+# 응답 스캔용 정규식 엔진 (google-re2가 있으면 백트래킹 없는 RE2, 없으면 표준 re)
+try:
+    import re2
+except ImportError:
+    re2 = None
+
 # =========================================================
 # 상수 정의
 # =========================================================
 MAX_RETRY_COUNT = 3
 RETRY_DELAY_SECONDS = 1
+MAX_RETRY_DELAY_SECONDS = 30  # 지수 백오프 상한
+# 시도마다 같은 요청을 여러 개 동시에 보내 먼저 길이를 채운 응답을 채택 (토큰 비용이 fanout배)
+PARALLEL_RETRIES = False
+PARALLEL_RETRY_FANOUT = 2
 DEFAULT_TEMPERATURE = 1.0
 MIN_NARRATIVE_LENGTH = 1000  # 최소 서사 길이 (문자)
 
@@ -45,14 +59,26 @@ MIN_NARRATIVE_LENGTH = 1000  # 최소 서사 길이 (문자)
 DEFAULT_MIN_RESPONSE_LENGTH = 500
 DEFAULT_MAX_RESPONSE_LENGTH = 1500
 
+# 길이 값이 상수이므로 지시문도 모듈 로드 시 1회만 생성
+LENGTH_INSTRUCTION = (
+    f"### [RESPONSE LENGTH DIRECTIVE]\n"
+    f"Write with appropriate detail. Target: {DEFAULT_MIN_RESPONSE_LENGTH}~{DEFAULT_MAX_RESPONSE_LENGTH} characters (Korean).\n"
+    f"- Minimum {DEFAULT_MIN_RESPONSE_LENGTH} chars required for narrative depth.\n"
+    f"- Avoid exceeding {DEFAULT_MAX_RESPONSE_LENGTH} chars to maintain pacing.\n"
+)
+
+
 def build_length_instruction() -> str:
-    """응답 길이 지시문을 생성합니다."""
-    return (
-        f"### [RESPONSE LENGTH DIRECTIVE]\n"
-        f"Write with appropriate detail. Target: {DEFAULT_MIN_RESPONSE_LENGTH}~{DEFAULT_MAX_RESPONSE_LENGTH} characters (Korean).\n"
-        f"- Minimum {DEFAULT_MIN_RESPONSE_LENGTH} chars required for narrative depth.\n"
-        f"- Avoid exceeding {DEFAULT_MAX_RESPONSE_LENGTH} chars to maintain pacing.\n"
-    )
+    """응답 길이 지시문을 반환합니다."""
+    return LENGTH_INSTRUCTION
+
+
+# 매 턴 사용자 입력 뒤에 붙는 숨은 리마인더 (길이 지시문 포함, 1회 생성)
+HIDDEN_REMINDER = (
+    f"\n\n{LENGTH_INSTRUCTION}\n"
+    f"(System Reminder: Record observable Macroscopic States only. "
+    f"The world continues asynchronously.)"
+)
 
 
 # =========================================================
@@ -347,6 +373,24 @@ Adhere strictly to [The Axiom Of The World].
 </Self_Correction_Protocol>
 """
 
+# DETECTION PATTERNS 중 텍스트로 잡히는 문구 - 응답 1회 스캔용 단일 정규식
+BANNED_TROPE_PHRASES = (
+    "Despite the odds",
+    "Somehow",
+    "Against all logic",
+    "A symphony of",
+    "A tapestry of",
+)
+_trope_re = re2 if re2 is not None else re
+BANNED_TROPE_PATTERN = _trope_re.compile(
+    r"(?i)\b(?:" + "|".join(_trope_re.escape(phrase) for phrase in BANNED_TROPE_PHRASES) + r")\b"
+)
+
+
+def find_banned_tropes(text: str) -> List[str]:
+    """응답에서 금지 트로프 문구를 한 번의 스캔으로 찾아 반환합니다."""
+    return [m.group(0) for m in BANNED_TROPE_PATTERN.finditer(text)]
+
 
 # =========================================================
 # MATERIAL PROCESSING PROTOCOL (입력 처리 프로토콜)
@@ -390,14 +434,41 @@ The AI is a **witness**, not a puppeteer of ANY player character.
 </Material_Processing_Protocol>
 """
 
+# 세션마다 바뀌지 않는 코어 지시문 (1-2번 + 코어 구성요소) - 모듈 로드 시 한 번만 결합
+STATIC_SYSTEM_PROMPT = "\n\n".join([
+    # [1] AI Mandate & Core Constraints
+    AI_MANDATE,
+    MEMORY_HIERARCHY,
+    
+    # [2] The Axiom Of The World
+    WORLD_AXIOM,
+    
+    # Core Instruction Components
+    INTERACTION_MODEL,
+    TEMPORAL_DYNAMICS,
+    RECORDER_IDENTITY,
+    CRITICAL_PRIORITY,
+    SELF_CORRECTION_PROTOCOL,
+    MATERIAL_PROCESSING_PROTOCOL,
+])
+
 
 # =========================================================
 # [8] SCRIPTS - 작노/글노 (장르/톤 기반 동적 생성)
 # 프롬프트 순서 8번
 # =========================================================
 
+SCRIPT_NOTE_CACHE_SIZE = 64  # 장르/톤 조합별 작가·글쓰기 노트 캐시 크기
+
+
 def build_author_note(active_genres: Optional[List[str]] = None, custom_tone: Optional[str] = None) -> str:
-    """장르와 톤을 기반으로 작가 노트를 동적 생성합니다."""
+    """장르와 톤을 기반으로 작가 노트를 동적 생성합니다. (같은 조합은 캐시된 결과 반환)"""
+    return _build_author_note(tuple(active_genres) if active_genres else (), custom_tone)
+
+
+@functools.lru_cache(maxsize=SCRIPT_NOTE_CACHE_SIZE)
+def _build_author_note(active_genres: Tuple[str, ...], custom_tone: Optional[str]) -> str:
+    """build_author_note의 실제 조립 (해시 가능한 튜플 인자)"""
     base_note = """## 작가 노트 (Author's Note)
 - 현재 장면의 분위기와 톤을 유지하세요
 - NPC의 개성과 말투를 일관되게 표현하세요
@@ -422,8 +493,9 @@ def build_author_note(active_genres: Optional[List[str]] = None, custom_tone: Op
             'military': "- 전술적 긴장감과 전우애, 명령체계의 압박을 그리세요"
         }
         for genre in active_genres:
-            if genre.lower() in genre_hints:
-                genre_specific += f"\n{genre_hints[genre.lower()]}"
+            hint = genre_hints.get(genre.lower())
+            if hint:
+                genre_specific += f"\n{hint}"
     
     tone_specific = ""
     if custom_tone:
@@ -435,7 +507,13 @@ def build_author_note(active_genres: Optional[List[str]] = None, custom_tone: Op
 
 
 def build_writing_note(active_genres: Optional[List[str]] = None) -> str:
-    """장르를 기반으로 글쓰기 노트를 동적 생성합니다."""
+    """장르를 기반으로 글쓰기 노트를 동적 생성합니다. (같은 조합은 캐시된 결과 반환)"""
+    return _build_writing_note(tuple(active_genres) if active_genres else ())
+
+
+@functools.lru_cache(maxsize=SCRIPT_NOTE_CACHE_SIZE)
+def _build_writing_note(active_genres: Tuple[str, ...]) -> str:
+    """build_writing_note의 실제 조립 (해시 가능한 튜플 인자)"""
     base_note = """## 글쓰기 노트 (Writing Note)
 - 감각적 묘사를 우선하세요 (시각, 청각, 촉각, 후각, 미각)
 - 대화와 서술의 균형을 맞추세요"""
@@ -454,8 +532,9 @@ def build_writing_note(active_genres: Optional[List[str]] = None) -> str:
             'military': "- 군사 용어와 명령 구조를 정확히 사용하세요. 계급 호칭에 유의하세요"
         }
         for genre in active_genres:
-            if genre.lower() in style_map:
-                style_hints.append(style_map[genre.lower()])
+            hint = style_map.get(genre.lower())
+            if hint:
+                style_hints.append(hint)
     
     # 기본 스타일 힌트
     default_hints = """
@@ -613,7 +692,8 @@ SAFETY_SETTINGS = [
 # =========================================================
 # 장르 정의
 # =========================================================
-GENRE_DEFINITIONS: Dict[str, str] = {
+# 여러 비동기 태스크가 공유하므로 읽기 전용 뷰로 노출 (실수로 수정하면 즉시 TypeError)
+GENRE_DEFINITIONS: Mapping[str, str] = MappingProxyType({
     'wuxia': "Chivalry(협), Martial Arts, En-yuan(은원), Jianghu(강호). Honor-bound warriors in a world of sects and vendettas.",
     'noir': "Moral ambiguity, Cynicism, Shadows, Tragic inevitability. Everyone has secrets; trust is a liability.",
     'high_fantasy': "Epic scale, Magic systems, Prophecy, Good vs Evil. Ancient powers and world-shaking stakes.",
@@ -628,58 +708,193 @@ GENRE_DEFINITIONS: Dict[str, str] = {
     'western': "Frontier justice, Outlaws, Desolate landscapes. Law is what you make it.",
     'occult': "Supernatural entities, Curses, Psychological terror. The veil is thin and malevolent.",
     'military': "Tactical combat, Hierarchy, Brotherhood, Strategic operations. War's machinery and its human cost."
-}
+})
+
+# 장르 모듈 목록의 각 줄을 미리 만들어 둠 (set_genres에서는 조회만)
+GENRE_LINES: Mapping[str, str] = MappingProxyType({
+    genre: f"- **{genre.upper()}:** {definition}\n"
+    for genre, definition in GENRE_DEFINITIONS.items()
+})
 
 
 # =========================================================
 # ChatSessionAdapter 클래스
 # =========================================================
+def make_text_content(role: str, text: str) -> types.Content:
+    """
+    텍스트 한 조각짜리 Content를 만듭니다.
+    
+    role/text는 항상 올바른 값이므로 pydantic 검증을 건너뛰는 model_construct를 사용합니다.
+    """
+    return types.Content.model_construct(
+        role=role,
+        parts=[types.Part.model_construct(text=text)]
+    )
+
+
+# 세션에 유지할 최근 턴 수 (초기화 턴 제외)
+# domain_manager.MAX_HISTORY_LENGTH(40) + 이번 턴의 재시도 여유분보다 커야 저장된 히스토리가 잘리지 않음
+SESSION_HISTORY_MAXLEN = 64
+
+
+def _content_chars(content: types.Content) -> int:
+    """Content에 담긴 텍스트 글자 수"""
+    return sum(len(part.text or "") for part in content.parts or ())
+
+
 class ChatSessionAdapter:
     """
     Gemini API와의 대화 세션을 관리하는 어댑터입니다.
+    
+    생성 시 받은 history(초기화 턴)는 고정 접두부로 보관하고, 이후 턴은
+    최대 max_history개까지만 유지하는 deque에 쌓아 요청 크기가 무한히 커지지 않게 합니다.
+    전송 분량(total_chars)은 턴을 넣을 때마다 갱신하므로 전체를 다시 셀 필요가 없습니다.
     """
     
+    __slots__ = ("client", "model", "prefix", "tail", "config", "_tail_chars", "total_chars")
+    
     def __init__(
         self,
         client,
         model: str,
         history: List[types.Content],
-        config: types.GenerateContentConfig
+        config: types.GenerateContentConfig,
+        max_history: int = SESSION_HISTORY_MAXLEN
     ):
         self.client = client
         self.model = model
-        self.history = history
+        self.prefix: Tuple[types.Content, ...] = tuple(history)
+        self.tail: deque = deque(maxlen=max_history)
+        self._tail_chars: deque = deque(maxlen=max_history)  # tail과 같은 순서의 턴별 글자 수
+        self.total_chars = sum(_content_chars(c) for c in self.prefix)
         self.config = config
     
-    async def send_message(self, content: str) -> Optional[types.GenerateContentResponse]:
+    @property
+    def history(self) -> List[types.Content]:
+        """API에 전달되는 전체 히스토리 (고정 접두부 + 최근 턴)"""
+        return [*self.prefix, *self.tail]
+    
+    def _push(self, content: types.Content) -> None:
+        """턴을 추가하고 글자 수 합계를 갱신합니다. (maxlen 초과로 밀려나는 턴은 차감)"""
+        if len(self.tail) == self.tail.maxlen:
+            self.total_chars -= self._tail_chars[0]
+        chars = _content_chars(content)
+        self.tail.append(content)
+        self._tail_chars.append(chars)
+        self.total_chars += chars
+    
+    def _outgoing(self, user_content: types.Content) -> List[types.Content]:
+        """전송할 contents (히스토리 + 새 user 턴)를 리스트 한 번의 복사로 만듭니다."""
+        return [*self.prefix, *self.tail, user_content]
+    
+    def extend_history(self, contents: List[types.Content]) -> None:
+        """이전 대화 턴을 세션에 추가합니다."""
+        for content in contents:
+            self._push(content)
+    
+    async def _generate(self, contents: List[types.Content]) -> str:
+        """스트리밍으로 응답을 받아 텍스트 조각을 하나로 합칩니다. (히스토리는 건드리지 않음)"""
+        chunks = []
+        async for chunk in await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=contents,
+            config=self.config
+        ):
+            if chunk.text:
+                chunks.append(chunk.text)
+        return "".join(chunks)
+    
+    async def send_message_best_of(self, content: str, fanout: int, min_length: int) -> Optional[str]:
+        """
+        같은 메시지를 fanout개 동시에 요청해 min_length를 넘는 첫 응답을 채택합니다.
+        
+        채택되면 나머지 요청은 취소합니다. 모두 미달이면 가장 긴 응답을 채택하고,
+        모두 실패하면 마지막 예외를 올립니다. 채택된 응답만 히스토리에 남깁니다.
+        """
+        contents = self._outgoing(make_text_content("user", content))
+        tasks = [asyncio.ensure_future(self._generate(contents)) for _ in range(fanout)]
+        
+        best_text = ""
+        last_error: Optional[BaseException] = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    text = await next_done
+                except Exception as e:
+                    last_error = e
+                    continue
+                if len(text) > len(best_text):
+                    best_text = text
+                if len(best_text) >= min_length:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        if not best_text:
+            if last_error is not None:
+                logging.error(f"ChatSession.send_message_best_of 오류: {last_error}")
+                raise last_error
+            return None
+        
+        self._push(contents[-1])
+        self._push(make_text_content("model", best_text))
+        return best_text
+    
+    async def send_message(self, content: str) -> Optional[str]:
         """
-        메시지를 전송하고 응답을 받습니다.
+        메시지를 전송하고 응답 텍스트를 받습니다.
+        
+        스트리밍으로 받아 조각을 모으므로 수신과 처리가 겹칩니다. 응답이 비면 None을 반환합니다.
+        히스토리는 응답을 받은 뒤에만 user/model 턴을 함께 추가하므로 실패 시 되돌릴 것이 없습니다.
         """
-        self.history.append(
-            types.Content(role="user", parts=[types.Part(text=content)])
-        )
+        user_content = make_text_content("user", content)
+        contents = self._outgoing(user_content)
+        logging.debug("[Session] 전송: %d턴, 약 %d자", len(contents), self.total_chars + len(content))
         
         try:
-            response = await self.client.aio.models.generate_content(
-                model=self.model,
-                contents=self.history,
-                config=self.config
-            )
-            
-            if response and response.text:
-                model_content = types.Content(
-                    role="model",
-                    parts=[types.Part(text=response.text)]
-                )
-                self.history.append(model_content)
-            
-            return response
-            
+            response_text = await self._generate(contents)
         except Exception as e:
             logging.error(f"ChatSession.send_message 오류: {e}")
-            if self.history and self.history[-1].role == "user":
-                self.history.pop()
             raise
+        
+        if not response_text:
+            return None
+        
+        self._push(user_content)
+        self._push(make_text_content("model", response_text))
+        return response_text
+
+
+# =========================================================
+# 히스토리 Content 변환 캐시
+# =========================================================
+# 채널별 {(role, text): Content} - 이전 턴에 변환한 항목은 재사용하고 새 턴만 변환
+_history_content_cache: Dict[str, Dict[Tuple[str, str], types.Content]] = {}
+
+
+def build_history_contents(channel_id: str, history: List[Dict[str, str]]) -> List[types.Content]:
+    """
+    저장된 히스토리를 세션용 Content 목록으로 변환합니다.
+    
+    직전 호출에서 변환한 항목은 그대로 재사용하므로 매 턴 새로 만드는 것은
+    추가된 턴뿐입니다. 히스토리에서 밀려난 항목은 캐시에서도 제거됩니다.
+    """
+    previous = _history_content_cache.get(channel_id, {})
+    current: Dict[Tuple[str, str], types.Content] = {}
+    contents = []
+    
+    for h in history:
+        role = "user" if h['role'] == "User" else "model"
+        key = (role, h['content'])
+        content = current.get(key) or previous.get(key)
+        if content is None:
+            content = make_text_content(role, h['content'])
+        current[key] = content
+        contents.append(content)
+    
+    _history_content_cache[channel_id] = current
+    return contents
 
 
 # =========================================================
@@ -862,20 +1077,22 @@ class PromptBuilder:
         """활성 장르 설정"""
         self.sections['_active_genres'] = active_genres  # 내부 저장용
         if active_genres:
-            genre_text = "### ACTIVE GENRE MODULES\n"
-            genre_text += "The following genre elements are active. Fuse them organically:\n\n"
+            parts = [
+                "### ACTIVE GENRE MODULES\n",
+                "The following genre elements are active. Fuse them organically:\n\n",
+            ]
             
             for genre in active_genres:
-                definition = GENRE_DEFINITIONS.get(
-                    genre.lower(),
-                    "(Custom genre traits applied)"
-                )
-                genre_text += f"- **{genre.upper()}:** {definition}\n"
+                # 장르 키는 대부분 이미 소문자이므로 그대로 먼저 찾고, 없을 때만 소문자 변환
+                line = GENRE_LINES.get(genre) or GENRE_LINES.get(genre.lower())
+                if line is None:
+                    line = f"- **{genre.upper()}:** (Custom genre traits applied)\n"
+                parts.append(line)
             
-            genre_text += "\n**[FUSION DIRECTIVE]:** Blend these elements seamlessly. "
-            genre_text += "Genre conventions must still obey the World Axiom.\n"
+            parts.append("\n**[FUSION DIRECTIVE]:** Blend these elements seamlessly. ")
+            parts.append("Genre conventions must still obey the World Axiom.\n")
             
-            self.sections['genres'] = genre_text
+            self.sections['genres'] = "".join(parts)
         return self
     
     def set_custom_tone(self, custom_tone: Optional[str] = None) -> 'PromptBuilder':
@@ -896,20 +1113,8 @@ This tone affects style, not physics or causality.
         캐시 경계 이전까지의 정적 컨텐츠
         """
         parts = [
-            # [1] AI Mandate & Core Constraints
-            AI_MANDATE,
-            MEMORY_HIERARCHY,
-            
-            # [2] The Axiom Of The World
-            WORLD_AXIOM,
-            
-            # Core Instruction Components
-            INTERACTION_MODEL,
-            TEMPORAL_DYNAMICS,
-            RECORDER_IDENTITY,
-            CRITICAL_PRIORITY,
-            SELF_CORRECTION_PROTOCOL,
-            MATERIAL_PROCESSING_PROTOCOL,
+            # [1]-[2] + Core Instruction Components (미리 결합된 정적 프리픽스)
+            STATIC_SYSTEM_PROMPT,
         ]
         
         # 장르 추가
@@ -987,16 +1192,35 @@ This tone affects style, not physics or causality.
 # =========================================================
 # 시스템 프롬프트 구성 (기존 호환성 유지)
 # =========================================================
+SYSTEM_PROMPT_CACHE_SIZE = 128  # 장르/톤 조합별 시스템 프롬프트 캐시 크기
+
+
+def _genre_cache_key(active_genres: Optional[List[str]]) -> Optional[Tuple[str, ...]]:
+    """
+    시스템 프롬프트 캐시용 장르 키를 만듭니다.
+    
+    장르 줄은 대소문자와 무관하게 조립되므로(소문자로 조회, 대문자로 표기) 소문자로 맞춰
+    "Noir"/"noir"가 같은 캐시 항목을 쓰게 합니다. 순서는 프롬프트에 그대로 반영되므로 유지합니다.
+    """
+    return tuple(genre.lower() for genre in active_genres) if active_genres else None
+
+
 def construct_system_prompt(
     active_genres: Optional[List[str]] = None,
     custom_tone: Optional[str] = None
 ) -> str:
     """
     장르와 톤을 기반으로 시스템 프롬프트를 조립합니다.
-    (기존 API 호환성 유지)
+    (기존 API 호환성 유지, 같은 조합은 캐시된 결과 반환)
     """
+    return _construct_system_prompt(_genre_cache_key(active_genres), custom_tone)
+
+
+@functools.lru_cache(maxsize=SYSTEM_PROMPT_CACHE_SIZE)
+def _construct_system_prompt(active_genres: Optional[Tuple[str, ...]], custom_tone: Optional[str]) -> str:
+    """construct_system_prompt의 실제 조립 (해시 가능한 튜플 인자)"""
     builder = PromptBuilder()
-    builder.set_genres(active_genres)
+    builder.set_genres(list(active_genres) if active_genres else None)
     builder.set_custom_tone(custom_tone)
     return builder.build_system_prompt()
 
@@ -1004,36 +1228,32 @@ def construct_system_prompt(
 # =========================================================
 # 세션 생성 (프리셋 순서 적용)
 # =========================================================
-def create_risu_style_session(
-    client,
-    model_version: str,
+# 로어/룰은 거의 바뀌지 않으므로 같은 입력이면 조립된 프롬프트와 초기화 턴을 재사용
+SESSION_PROMPT_CACHE_SIZE = 32
+
+
+@functools.lru_cache(maxsize=SESSION_PROMPT_CACHE_SIZE)
+def _build_session_system_prompt(
+    active_genres: Optional[Tuple[str, ...]],
+    custom_tone: Optional[str],
     lore_text: str,
-    rule_text: str = "",
-    active_genres: Optional[List[str]] = None,
-    custom_tone: Optional[str] = None,
-    deep_memory: str = "",
-    fermented_summary: str = "",
-    character_descriptions: str = ""
-) -> ChatSessionAdapter:
-    """
-    RisuAI/SillyTavern 스타일의 세션을 생성합니다.
-    프리셋 순서에 맞게 프롬프트를 조립합니다.
-    """
+    rule_text: str,
+    character_descriptions: str,
+    fermented_summary: str,
+    deep_memory: str
+) -> str:
+    """세션용 시스템 프롬프트를 조립합니다. (입력이 같으면 캐시 반환)"""
     builder = PromptBuilder()
-    
-    # 프롬프트 구성
-    builder.set_genres(active_genres)
+    builder.set_genres(list(active_genres) if active_genres else None)
     builder.set_custom_tone(custom_tone)
     builder.set_lore(lore_text, rule_text)
     builder.set_roles(character_descriptions)
     builder.set_fermented(fermented_summary, deep_memory)
-    
-    system_prompt = builder.build_system_prompt()
-    
-    # 초기화 메시지
-    init_context = f"""
-{system_prompt}
+    return builder.build_system_prompt()
 
+
+# 초기화 턴의 고정 부분 - 모든 세션이 같은 문자열/Content를 공유
+INITIALIZATION_BLOCK = """
 <Initialization>
 Recorder 'Misel' is now active.
 Observing Macroscopic States only.
@@ -1041,22 +1261,56 @@ The world is asynchronous—it does not wait.
 Recording in Korean. Awaiting observable events.
 </Initialization>
 """
-    
-    initial_history = [
-        types.Content(
-            role="user",
-            parts=[types.Part(text=init_context)]
-        ),
-        types.Content(
-            role="model",
-            parts=[types.Part(text="[RECORDER INITIALIZED] Misel standing by. Observing.")]
+INITIALIZATION_ACK = make_text_content("model", "[RECORDER INITIALIZED] Misel standing by. Observing.")
+
+
+@functools.lru_cache(maxsize=SESSION_PROMPT_CACHE_SIZE)
+def _build_initial_history(system_prompt: str) -> Tuple[types.Content, types.Content]:
+    """시스템 프롬프트로 초기화 턴(user/model)을 만듭니다."""
+    init_context = f"\n{system_prompt}\n{INITIALIZATION_BLOCK}"
+    return (make_text_content("user", init_context), INITIALIZATION_ACK)
+
+
+@functools.lru_cache(maxsize=SESSION_PROMPT_CACHE_SIZE)
+def _get_session_config(cached_content: Optional[str] = None) -> types.GenerateContentConfig:
+    """세션 생성 설정을 반환합니다. (세션 간 공유, 수정하지 말 것)"""
+    if cached_content:
+        return types.GenerateContentConfig(
+            temperature=DEFAULT_TEMPERATURE,
+            safety_settings=SAFETY_SETTINGS,
+            cached_content=cached_content
         )
-    ]
-    
-    config = types.GenerateContentConfig(
+    return types.GenerateContentConfig(
         temperature=DEFAULT_TEMPERATURE,
         safety_settings=SAFETY_SETTINGS
     )
+
+
+def create_risu_style_session(
+    client,
+    model_version: str,
+    lore_text: str,
+    rule_text: str = "",
+    active_genres: Optional[List[str]] = None,
+    custom_tone: Optional[str] = None,
+    deep_memory: str = "",
+    fermented_summary: str = "",
+    character_descriptions: str = ""
+) -> ChatSessionAdapter:
+    """
+    RisuAI/SillyTavern 스타일의 세션을 생성합니다.
+    프리셋 순서에 맞게 프롬프트를 조립합니다.
+    """
+    system_prompt = _build_session_system_prompt(
+        _genre_cache_key(active_genres),
+        custom_tone, lore_text, rule_text,
+        character_descriptions, fermented_summary, deep_memory
+    )
+    
+    # 초기화 턴은 캐시된 Content를 공유하고, 리스트만 세션별로 새로 만듦
+    initial_history = list(_build_initial_history(system_prompt))
+    
+    config = _get_session_config()
     
     return ChatSessionAdapter(
         client=client,
@@ -1069,6 +1323,13 @@ Recording in Korean. Awaiting observable events.
 # =========================================================
 # 응답 생성 (재시도 포함)
 # =========================================================
+def _log_banned_tropes(response_text: str) -> None:
+    """반환할 응답에 금지 트로프 문구가 있으면 기록합니다. (버려지는 재시도 응답은 스캔하지 않음)"""
+    banned = find_banned_tropes(response_text)
+    if banned:
+        logging.warning("[Trope] 금지 문구 감지: %s", ", ".join(banned))
+
+
 async def generate_response_with_retry(
     client,
     chat_session: ChatSessionAdapter,
@@ -1080,33 +1341,42 @@ async def generate_response_with_retry(
     min_length = DEFAULT_MIN_RESPONSE_LENGTH
     max_length = DEFAULT_MAX_RESPONSE_LENGTH
     
-    length_instruction = build_length_instruction()
+    hidden_reminder = HIDDEN_REMINDER
+    full_input = user_input + hidden_reminder
     
-    hidden_reminder = (
-        f"\n\n{length_instruction}\n"
-        f"(System Reminder: Record observable Macroscopic States only. "
-        f"The world continues asynchronously.)"
+    # 재시도 프롬프트는 응답 길이만 달라지므로 뒷부분을 미리 만들어 둠
+    # (사용자 입력을 복사하는 결합은 실제로 재시도할 때만 수행)
+    warning_suffix = (
+        f" chars. MUST write at least {min_length} chars. "
+        f"Add more sensory details, NPC reactions, and environmental descriptions.\n"
+        f"{hidden_reminder}"
     )
-    full_input = user_input + hidden_reminder
     
     best_response = None
     best_length = 0
     
     for attempt in range(MAX_RETRY_COUNT):
         try:
-            response = await chat_session.send_message(full_input)
+            if PARALLEL_RETRIES:
+                response_text = await chat_session.send_message_best_of(
+                    full_input, PARALLEL_RETRY_FANOUT, min_length
+                )
+            else:
+                response_text = await chat_session.send_message(full_input)
             
-            if response and response.text:
-                response_text = response.text
+            if response_text:
+                # 길이는 음절 단위로 세도록 NFC 기준 (대부분 이미 NFC라 추가 비용 거의 없음)
+                response_text = unicodedata.normalize("NFC", response_text)
                 response_length = len(response_text)
                 
                 if response_length >= min_length:
-                    logging.info(f"[Length] OK: {response_length}자")
+                    logging.info("[Length] OK: %d자", response_length)
+                    _log_banned_tropes(response_text)
                     return response_text
                 else:
                     logging.warning(
-                        f"[Length] SHORT: {response_length}자 < {min_length}자 "
-                        f"(시도 {attempt + 1}/{MAX_RETRY_COUNT})"
+                        "[Length] SHORT: %d자 < %d자 (시도 %d/%d)",
+                        response_length, min_length, attempt + 1, MAX_RETRY_COUNT
                     )
                     
                     if response_length > best_length:
@@ -1115,23 +1385,25 @@ async def generate_response_with_retry(
                     
                     if attempt < MAX_RETRY_COUNT - 1:
                         full_input = (
-                            f"{user_input}\n\n"
-                            f"⚠️ **[LENGTH WARNING]** Previous response was {response_length} chars. "
-                            f"MUST write at least {min_length} chars. "
-                            f"Add more sensory details, NPC reactions, and environmental descriptions.\n"
-                            f"{hidden_reminder}"
+                            f"{user_input}\n\n⚠️ **[LENGTH WARNING]** Previous response was "
+                            f"{response_length}{warning_suffix}"
                         )
+                        # 길이 미달은 API 장애가 아니므로 백오프 없이 바로 재요청
+                        continue
             else:
-                logging.warning(f"빈 응답 수신 (시도 {attempt + 1}/{MAX_RETRY_COUNT})")
+                logging.warning("빈 응답 수신 (시도 %d/%d)", attempt + 1, MAX_RETRY_COUNT)
             
         except Exception as e:
-            logging.warning(f"응답 생성 실패 (시도 {attempt + 1}/{MAX_RETRY_COUNT}): {e}")
+            logging.warning("응답 생성 실패 (시도 %d/%d): %s", attempt + 1, MAX_RETRY_COUNT, e)
         
         if attempt < MAX_RETRY_COUNT - 1:
-            await asyncio.sleep(RETRY_DELAY_SECONDS)
+            # 지수 백오프 + 지터 (여러 채널이 같은 박자로 재시도하며 몰리지 않도록)
+            delay = RETRY_DELAY_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5)
+            await asyncio.sleep(min(delay, MAX_RETRY_DELAY_SECONDS))
     
     if best_response:
-        logging.warning(f"[Length] FALLBACK: 최소 길이 미달이지만 반환 ({best_length}자)")
+        logging.warning("[Length] FALLBACK: 최소 길이 미달이지만 반환 (%d자)", best_length)
+        _log_banned_tropes(best_response)
         return best_response
     
     return "⚠️ **[시스템 경고]** 기록 장치 오류. 잠시 후 다시 시도해주세요."
@@ -1147,12 +1419,29 @@ def get_available_genres() -> List[str]:
 
 def get_genre_description(genre: str) -> Optional[str]:
     """특정 장르의 설명을 반환합니다."""
-    return GENRE_DEFINITIONS.get(genre.lower())
+    return GENRE_DEFINITIONS.get(genre) or GENRE_DEFINITIONS.get(genre.lower())
 
 
 # =========================================================
 # 캐싱 지원 세션 생성
 # =========================================================
+@functools.lru_cache(maxsize=SESSION_PROMPT_CACHE_SIZE)
+def _build_cache_system_prompt(
+    active_genres: Optional[Tuple[str, ...]],
+    custom_tone: Optional[str],
+    lore_text: str,
+    rule_text: str,
+    deep_memory: str
+) -> str:
+    """컨텍스트 캐시에 올릴 시스템 프롬프트를 조립합니다. (입력이 같으면 캐시 반환)"""
+    builder = PromptBuilder()
+    builder.set_genres(list(active_genres) if active_genres else None)
+    builder.set_custom_tone(custom_tone)
+    builder.set_lore(lore_text, rule_text)
+    builder.set_fermented(deep_memory=deep_memory)
+    return builder.build_system_prompt()
+
+
 async def create_cached_session(
     client,
     model_version: str,
@@ -1166,14 +1455,14 @@ async def create_cached_session(
 ) -> Tuple[ChatSessionAdapter, bool]:
     """
     캐싱을 지원하는 세션을 생성합니다.
-    """
-    builder = PromptBuilder()
-    builder.set_genres(active_genres)
-    builder.set_custom_tone(custom_tone)
-    builder.set_lore(lore_text, rule_text)
-    builder.set_fermented(deep_memory=deep_memory)
     
-    system_prompt_content = builder.build_system_prompt()
+    정적 프롬프트는 서버 측 컨텍스트 캐시에 한 번 올리고, 매 턴에는 히스토리와
+    새 입력만 전송합니다.
+    """
+    system_prompt_content = _build_cache_system_prompt(
+        _genre_cache_key(active_genres),
+        custom_tone, lore_text, rule_text, deep_memory
+    )
     
     cache_name = None
     if fermentation_module and hasattr(fermentation_module, 'get_or_create_cache'):
@@ -1189,11 +1478,7 @@ async def create_cached_session(
     if cache_name:
         logging.info(f"[Caching] 캐시 세션 생성 - {channel_id}")
         
-        config = types.GenerateContentConfig(
-            temperature=DEFAULT_TEMPERATURE,
-            safety_settings=SAFETY_SETTINGS,
-            cached_content=cache_name
-        )
+        config = _get_session_config(cache_name)
         
         session = ChatSessionAdapter(
             client=client,
@@ -13,6 +13,12 @@ from typing import Optional, Dict, Any, List, Tuple
 import domain_manager
 from google.genai import types
 
+# 빠른 JSON 파싱 (없으면 표준 json 사용)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # =========================================================
 # 상수 정의
 # =========================================================
@@ -20,6 +26,7 @@ MAX_RETRY_COUNT = 3
 RETRY_DELAY_SECONDS = 1
 MAX_ARCHIVE_DISPLAY = 3  # 보관함에서 표시할 최대 항목 수
 MAX_HISTORY_FOR_CHRONICLE = 50  # 연대기 생성 시 사용할 최대 히스토리
+CODE_FENCE_PATTERN = re.compile(r"```(json)?")
 
 
 # =========================================================
@@ -49,6 +56,8 @@ async def call_gemini_api(
     # system_instruction을 프롬프트에 포함시킴
     full_prompt = f"{system_instruction}\n\n{prompt}" if system_instruction else prompt
     
+    # 요청 본문은 한 번만 만들고 재시도마다 재사용
+    contents = [types.Content(role="user", parts=[types.Part(text=full_prompt)])]
     config = types.GenerateContentConfig(
         response_mime_type="application/json",
         temperature=0.1
@@ -58,15 +67,16 @@ async def call_gemini_api(
         try:
             response = await client.aio.models.generate_content(
                 model=model_id,
-                contents=[types.Content(role="user", parts=[types.Part(text=full_prompt)])],
+                contents=contents,
                 config=config
             )
             
             if response and response.text:
                 # JSON 파싱
-                clean_text = re.sub(r"```(json)?", "", response.text).strip()
+                clean_text = CODE_FENCE_PATTERN.sub("", response.text).strip()
                 clean_text = clean_text.strip("`")
-                return json.loads(clean_text)
+                # orjson.JSONDecodeError는 json.JSONDecodeError의 하위 클래스
+                return orjson.loads(clean_text) if orjson is not None else json.loads(clean_text)
                 
         except json.JSONDecodeError as e:
             logging.warning(f"[Quest API] JSON 파싱 실패 (시도 {attempt + 1}/{MAX_RETRY_COUNT}): {e}")
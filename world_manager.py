@@ -3,6 +3,7 @@ Lorekeeper TRPG Bot - World Manager Module
 시간, 날씨, 위기 수치 등 세계 상태를 관리합니다.
 """
 
+import bisect
 import random
 from typing import List, Dict, Any, Optional
 
@@ -20,6 +21,12 @@ DOOM_THRESHOLD_DANGER = 70
 DOOM_THRESHOLD_CRITICAL = 90
 DOOM_MAX = 100
 
+# 위기 수치 구간별 설명 - 경계값 이상이면 다음 구간 (bisect로 조회)
+DOOM_DESCRIPTION_CUTOFFS = (
+    DOOM_THRESHOLD_WARNING, DOOM_THRESHOLD_DANGER, DOOM_THRESHOLD_CRITICAL, DOOM_MAX
+)
+DOOM_DESCRIPTIONS = ("평온함", "불길한 징조", "임박한 위협", "절망적", "💥 파멸 💥")
+
 # 위험도별 doom 증가량
 DOOM_INCREASE_NIGHT = 1
 DOOM_INCREASE_NEMESIS_MIN = 1
@@ -129,7 +136,10 @@ def advance_time(channel_id: str) -> str:
     ai_risk = world.get("risk_level", "None").lower()
     location = world.get("current_location", "Unknown")
     
-    if "high" in ai_risk or "extreme" in ai_risk:
+    # 위험도 문자열은 한 번만 검사하고 결과를 아래 로어 규칙 루프에서도 재사용
+    has_high_risk = "high" in ai_risk
+    
+    if has_high_risk or "extreme" in ai_risk:
         doom_increase += DOOM_INCREASE_HIGH_RISK
         doom_reasons.append(f"💀 위험 지역({location}): 고위험 감지")
     elif "medium" in ai_risk:
@@ -138,8 +148,9 @@ def advance_time(channel_id: str) -> str:
     
     # 4. 정적 규칙 (Lore 기반)
     loc_rules = world.get("location_rules", {})
+    location_lower = location.lower()  # 규칙마다 다시 소문자화하지 않도록 한 번만
     for loc_name, rule in loc_rules.items():
-        if loc_name.lower() in location.lower():
+        if loc_name.lower() in location_lower:
             condition = rule.get("condition", "").lower()
             
             should_apply = False
@@ -149,7 +160,7 @@ def advance_time(channel_id: str) -> str:
                 should_apply = True
             
             # 이미 AI 위험도에서 처리된 경우 중복 방지
-            if should_apply and "high" not in ai_risk:
+            if should_apply and not has_high_risk:
                 doom_increase += DOOM_INCREASE_LORE_RULE
                 doom_reasons.append(f"📜 로어 규칙({loc_name})")
     
@@ -194,16 +205,7 @@ def change_doom(channel_id: str, amount: int) -> str:
 
 def _get_doom_description(doom_value: int) -> str:
     """위기 수치에 따른 설명을 반환합니다."""
-    if doom_value >= DOOM_MAX:
-        return "💥 파멸 💥"
-    elif doom_value >= DOOM_THRESHOLD_CRITICAL:
-        return "절망적"
-    elif doom_value >= DOOM_THRESHOLD_DANGER:
-        return "임박한 위협"
-    elif doom_value >= DOOM_THRESHOLD_WARNING:
-        return "불길한 징조"
-    else:
-        return "평온함"
+    return DOOM_DESCRIPTIONS[bisect.bisect_right(DOOM_DESCRIPTION_CUTOFFS, doom_value)]
 
 
 # =========================================================